@@ -0,0 +1,363 @@
+"""Headless API for the rooms, served apart from the Streamlit page
+
+A plain ASGI application over the same modules the Streamlit app uses:
+
+    GET  /health
+    GET  /metrics                         LLM usage, Prometheus text format
+    POST /rooms/{room}/reply              {"message", "history"?, "summary"?,
+                                           "cached"?}
+    WS   /rooms/{room}/stream             {"message", "history"?, "summary"?}
+                                          per reply
+    POST /translate                       {"sentence"} or {"sentences"}
+    POST /resume/review                   {"resume_text", "job_description",
+                                           "weights"?}
+    GET  /interviews/{session_id}
+    POST /interviews/{session_id}/start
+    POST /interviews/{session_id}/answer  {"text"}
+    WS   /interviews/{session_id}/stream  {"action": "start"} or
+                                          {"action": "answer", "text"}
+
+Rooms are stateless here: clients send the earlier turns as "history", of
+which those over the token budget are dropped, and may send a "summary" of
+older ones that is passed on as it is; the server never summarizes.
+Streamed replies arrive as {"type": "chunk", "text"} messages followed by
+{"type": "done", "text"}; errors as {"type": "error", "error"}.
+
+Run it with an ASGI server in a single worker, e.g. `uvicorn api:app`.
+Mock interviews live in the memory of the process serving them, between
+their saves to disk, so a second worker would hold stale copies of the
+same sessions; run more processes only behind a router that sends each
+session id to the same one.
+"""
+import asyncio
+import dataclasses
+import json
+import re
+
+import llm_metrics
+from context_builder import ConversationContext
+from formal_translation import formal_translator, translate_batch
+from mock_interview import InterviewSessions
+from prompts import ROOM_PROMPTS
+from resume_analysis import cached_job_requirements
+from resume_scoring import review_resume
+from rooms import generate_response
+
+_interviews = InterviewSessions()
+
+_REQUIRED = object()
+_END = object()
+
+
+class HTTPError(Exception):
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _field(data, name, kind, default=_REQUIRED):
+    value = data.get(name, default)
+    if value is _REQUIRED:
+        raise HTTPError(400, f"Missing field: {name}")
+    if value is not default and not isinstance(value, kind):
+        raise HTTPError(400, f"Field {name} must be of type {kind.__name__}")
+    return value
+
+
+def _history(data):
+    history = _field(data, "history", list, None)
+    if history is not None and not all(
+            isinstance(m, dict) and m.get("role") in ("user", "assistant")
+            and isinstance(m.get("content"), str) for m in history):
+        raise HTTPError(
+            400, "history must be a list of {role, content} messages")
+    return history
+
+
+def _room(room):
+    if room not in ROOM_PROMPTS:
+        raise HTTPError(404, f"Unknown room: {room}")
+    return room
+
+
+def _interview(session_id):
+    try:
+        return _interviews.get(session_id)
+    except ValueError as e:
+        raise HTTPError(400, str(e)) from e
+
+
+def _interview_state(interview):
+    return {
+        "status": interview.status,
+        "questions": interview.questions,
+        "remaining_seconds": interview.remaining(),
+        "history": list(interview.history)
+    }
+
+
+def _room_reply(data, room, stream):
+    """generate_response for a request's message and history"""
+    history = _history(data)
+    summary = _field(data, "summary", str, "")
+    conversation = {}
+    if history is not None or summary:
+        # Built for this request only, so nothing is summarized
+        conversation = dict(history=history or [],
+                            context=ConversationContext(summary=summary,
+                                                        summarize=False))
+    message = _field(data, "message", str)
+    room = _room(room)
+    cached = _field(data, "cached", bool, False)
+    try:
+        return generate_response(message,
+                                 room,
+                                 stream,
+                                 cached=cached,
+                                 **conversation)
+    except Exception as e:
+        raise HTTPError(502, f"LLM request failed: {e}") from e
+
+
+async def _send_chunks(chunks, emit):
+    """Send a stream as chunk messages, each read on a worker thread"""
+    text = ""
+    try:
+        while True:
+            chunk = await asyncio.to_thread(next, chunks, _END)
+            if chunk is _END:
+                break
+            text += str(chunk)
+            await emit({"type": "chunk", "text": str(chunk)})
+    finally:
+        # Stops the LLM stream if the client went away
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            await asyncio.to_thread(close)
+    await emit({"type": "done", "text": text})
+
+
+async def health(data):
+    return {"status": "ok"}
+
+
+async def metrics(data):
+    return llm_metrics.prometheus_text()
+
+
+async def room_reply(data, room):
+    return {"reply": await asyncio.to_thread(_room_reply, data, room, False)}
+
+
+async def room_stream(data, emit, room):
+    chunks = await asyncio.to_thread(_room_reply, data, room, True)
+    await _send_chunks(chunks, emit)
+
+
+async def translate(data):
+    if "sentences" in data:
+        sentences = _field(data, "sentences", list)
+        if not all(isinstance(s, str) for s in sentences):
+            raise HTTPError(400, "sentences must be a list of strings")
+        pairs = await asyncio.to_thread(
+            lambda: list(translate_batch(sentences)))
+        return {
+            "translations": [{
+                "sentence": sentence,
+                "translation": translation
+            } for sentence, translation in pairs]
+        }
+    sentence = _field(data, "sentence", str)
+    return {
+        "translation": await asyncio.to_thread(formal_translator, sentence)
+    }
+
+
+async def resume_review(data):
+    resume_text = _field(data, "resume_text", str)
+    job_description = _field(data, "job_description", str)
+    weights = _field(data, "weights", dict, None)
+    if weights is not None and not all(
+            isinstance(w, (int, float)) and w >= 0 for w in weights.values()):
+        raise HTTPError(400, "weights must map names to numbers of at least 0")
+    try:
+        requirements = await asyncio.to_thread(cached_job_requirements,
+                                               job_description)
+    except Exception as e:
+        raise HTTPError(
+            502, f"Could not extract the job requirements: {e}") from e
+    if requirements is None:
+        raise HTTPError(502, "Could not extract the job requirements")
+    try:
+        review = await asyncio.to_thread(review_resume, resume_text,
+                                         requirements)
+    except ValueError as e:
+        raise HTTPError(502, f"Could not review the resume: {e}") from e
+    return {
+        "score": review.score(weights),
+        "job_requirements": requirements,
+        "review": dataclasses.asdict(review),
+        "analysis": review.as_markdown()
+    }
+
+
+async def interview_state(data, session_id):
+    interview = _interview(session_id)
+    await asyncio.to_thread(interview.running)
+    return _interview_state(interview)
+
+
+async def _interview_turn(interview, data, stream):
+    """Chunks of the reply to a start or answer request"""
+    action = _field(data, "action", str)
+    if action == "start":
+        return await asyncio.to_thread(interview.start, stream)
+    if action == "answer":
+        chunks = await asyncio.to_thread(interview.answer,
+                                         _field(data, "text", str), stream)
+        if chunks is None:
+            raise HTTPError(409, "The interview is not taking answers")
+        return chunks
+    raise HTTPError(400, "action must be start or answer")
+
+
+async def interview_action(data, session_id, action):
+    interview = _interview(session_id)
+    chunks = await _interview_turn(interview, dict(data, action=action),
+                                   False)
+    reply = await asyncio.to_thread(lambda: "".join(map(str, chunks)))
+    return {"reply": reply, "interview": _interview_state(interview)}
+
+
+async def interview_stream(data, emit, session_id):
+    interview = _interview(session_id)
+    chunks = await _interview_turn(interview, data, True)
+    await _send_chunks(chunks, emit)
+    await emit({"type": "state", **_interview_state(interview)})
+
+
+ROUTES = [
+    ("GET", r"/health", health),
+    ("GET", r"/metrics", metrics),
+    ("POST", r"/rooms/(?P<room>[^/]+)/reply", room_reply),
+    ("WEBSOCKET", r"/rooms/(?P<room>[^/]+)/stream", room_stream),
+    ("POST", r"/translate", translate),
+    ("POST", r"/resume/review", resume_review),
+    ("GET", r"/interviews/(?P<session_id>[^/]+)", interview_state),
+    ("POST", r"/interviews/(?P<session_id>[^/]+)/(?P<action>start|answer)",
+     interview_action),
+    ("WEBSOCKET", r"/interviews/(?P<session_id>[^/]+)/stream",
+     interview_stream),
+]
+_ROUTES = [(method, re.compile(pattern + "$"), handler)
+           for method, pattern, handler in ROUTES]
+
+
+def _route(method, path):
+    """(handler, path parameters) for a request"""
+    allowed = False
+    for route_method, pattern, handler in _ROUTES:
+        match = pattern.match(path)
+        if match:
+            if route_method == method:
+                return handler, match.groupdict()
+            allowed = True
+    raise HTTPError(405 if allowed else 404,
+                    "Method not allowed" if allowed else "Not found")
+
+
+async def _read_json(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            break
+    return _parse(body or b"{}")
+
+
+def _parse(body):
+    try:
+        data = json.loads(body)
+    except ValueError as e:
+        raise HTTPError(400, "Body is not valid JSON") from e
+    if not isinstance(data, dict):
+        raise HTTPError(400, "Body must be a JSON object")
+    return data
+
+
+async def _respond(send, status, body):
+    if isinstance(body, str):
+        content_type = b"text/plain; version=0.0.4; charset=utf-8"
+        payload = body.encode("utf-8")
+    else:
+        content_type = b"application/json"
+        payload = json.dumps(body).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", content_type),
+                    (b"content-length", str(len(payload)).encode())]
+    })
+    await send({"type": "http.response.body", "body": payload})
+
+
+async def _http(scope, receive, send):
+    try:
+        handler, params = _route(scope["method"], scope["path"])
+        data = await _read_json(receive) if scope["method"] == "POST" else {}
+        await _respond(send, 200, await handler(data, **params))
+    except HTTPError as e:
+        await _respond(send, e.status, {"error": e.message})
+    except Exception as e:
+        await _respond(send, 500, {"error": f"An error occurred: {e}"})
+
+
+async def _websocket(scope, receive, send):
+    if (await receive())["type"] != "websocket.connect":
+        return
+    try:
+        handler, params = _route("WEBSOCKET", scope["path"])
+    except HTTPError:
+        await send({"type": "websocket.close", "code": 4404})
+        return
+    await send({"type": "websocket.accept"})
+
+    async def emit(event):
+        await send({"type": "websocket.send", "text": json.dumps(event)})
+
+    # One request at a time per socket, each answered by its own stream
+    while True:
+        message = await receive()
+        if message["type"] == "websocket.disconnect":
+            return
+        try:
+            data = _parse(message.get("text") or message.get("bytes") or b"")
+            await handler(data, emit, **params)
+        except HTTPError as e:
+            await emit({"type": "error", "error": e.message})
+        except Exception as e:
+            # The socket stays open for the next request
+            await emit({"type": "error", "error": f"An error occurred: {e}"})
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    """The ASGI entry point"""
+    if scope["type"] == "http":
+        await _http(scope, receive, send)
+    elif scope["type"] == "websocket":
+        await _websocket(scope, receive, send)
+    elif scope["type"] == "lifespan":
+        await _lifespan(receive, send)
@@ -0,0 +1,52 @@
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from streamlit.runtime.scriptrunner import (add_script_run_ctx,
+                                                get_script_run_ctx)
+except ImportError:
+    add_script_run_ctx = get_script_run_ctx = None
+
+# Threads shared by all background work in the process
+BACKGROUND_WORKERS = int(os.getenv("BACKGROUND_WORKERS", "16"))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Process-wide thread pool, created on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=BACKGROUND_WORKERS,
+                                           thread_name_prefix="background")
+    return _executor
+
+
+def _script_run_ctx():
+    """The current thread's Streamlit context, None without one"""
+    if get_script_run_ctx is None:
+        return None
+    # Outside a Streamlit script (the API, the CLIs) None is expected
+    return get_script_run_ctx(suppress_warning=True)
+
+
+def submit(fn, *args, **kwargs):
+    """Run fn on the shared pool and return its Future
+
+    When called from a Streamlit script, the task runs with that script's
+    context, so st.* calls made from it (e.g. st.error) reach the session.
+    Context variables, such as llm_metrics labels, are carried over too.
+    """
+    ctx = _script_run_ctx()
+    variables = contextvars.copy_context()
+
+    def run():
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+        return variables.run(fn, *args, **kwargs)
+
+    return get_executor().submit(run)
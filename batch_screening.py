@@ -0,0 +1,195 @@
+"""Score many resumes against one job description
+
+Usage: python batch_screening.py JOB_DESCRIPTION_FILE RESUME [RESUME ...]
+where each RESUME is a PDF, a zip of PDFs or a directory of either.
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from pdf_cache import cached_pdf_text, get_process_pool
+from resume_analysis import cached_job_requirements
+from resume_prerank import prerank_scores, shortlist
+from resume_scoring import review_resume
+
+# Resumes analyzed by the LLM at once
+SCREENING_CONCURRENCY = int(os.getenv("SCREENING_CONCURRENCY", "8"))
+
+# Best pre-ranked resumes given a full LLM review; 0 reviews every resume
+SCREENING_TOP_K = int(os.getenv("SCREENING_TOP_K", "20"))
+
+NOT_SHORTLISTED = "Not shortlisted: low match with the job requirements"
+
+CSV_FIELDS = ["rank", "name", "score", "match", "analysis"]
+
+
+def expand_uploads(files):
+    """Yield (name, pdf_bytes) from (name, bytes) pairs, unpacking zips"""
+    for name, data in files:
+        if name.lower().endswith(".zip"):
+            with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                for member in archive.infolist():
+                    if (not member.is_dir()
+                            and member.filename.lower().endswith(".pdf")):
+                        yield member.filename, archive.read(member)
+        elif name.lower().endswith(".pdf"):
+            yield name, data
+
+
+def read_paths(paths):
+    """Yield (name, bytes) for PDF and zip files, walking directories"""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                yield from read_paths(
+                    os.path.join(root, name) for name in sorted(names)
+                    if name.lower().endswith((".pdf", ".zip")))
+        else:
+            with open(path, "rb") as f:
+                yield path, f.read()
+
+
+def _extract(data):
+    # Runs in a pool worker, which must not start a pool of its own
+    return cached_pdf_text(data, parallel=False)
+
+
+def screen_resumes(files,
+                   job_description,
+                   concurrency=SCREENING_CONCURRENCY,
+                   top_k=SCREENING_TOP_K):
+    """Analyze resumes against one job description
+
+    `files` is an iterable of (name, bytes), where zips are unpacked. Text is
+    extracted in a process pool, then every resume is pre-ranked locally by
+    its match with the job requirements (see resume_prerank). Only the
+    `top_k` best are reviewed by the LLM, at most `concurrency` at once; the
+    others are yielded first, with no score, after any PDFs whose text could
+    not be extracted, scored 0. Yields a result dict per resume.
+    """
+    pdfs = list(expand_uploads(files))
+    pool = get_process_pool()
+    futures = [pool.submit(_extract, data) for _, data in pdfs]
+    job_requirements = cached_job_requirements(job_description)
+    names = []
+    texts = []
+    for (name, _), future in zip(pdfs, futures):
+        try:
+            texts.append(future.result())
+        except Exception as e:
+            # An unreadable PDF gets an error row, the others go on
+            yield {
+                "name": name,
+                "score": 0,
+                "match": None,
+                "analysis": f"Error: could not read the PDF: {e}"
+            }
+            continue
+        names.append(name)
+
+    matches = prerank_scores(texts, job_requirements)
+    if matches is None:
+        # Without NumPy every resume is reviewed
+        matches = [None] * len(texts)
+        selected = range(len(texts))
+    else:
+        selected = shortlist(matches, top_k)
+        shortlisted = set(selected)
+        for i, name in enumerate(names):
+            if i not in shortlisted:
+                yield {
+                    "name": name,
+                    "score": None,
+                    "match": round(matches[i], 1),
+                    "analysis": NOT_SHORTLISTED
+                }
+
+    def analyze(i):
+        result = {"name": names[i], "match": matches[i]}
+        if result["match"] is not None:
+            result["match"] = round(result["match"], 1)
+        try:
+            review = review_resume(texts[i], job_requirements)
+        except Exception as e:
+            return dict(result, score=0, analysis=f"Error: {e}")
+        return dict(result,
+                    score=round(review.score(), 1),
+                    analysis=review.as_markdown())
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(analyze, i) for i in selected]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def rank(results):
+    """Results sorted by score, best first, with their rank filled in"""
+    # Reviewed resumes by score, then the rest by their pre-rank match
+    ranked = sorted(results,
+                    key=lambda r: (r["score"] is not None, r["score"] or 0,
+                                   r["match"] or 0),
+                    reverse=True)
+    return [dict(result, rank=i) for i, result in enumerate(ranked, 1)]
+
+
+def results_to_csv(results):
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=CSV_FIELDS)
+    writer.writeheader()
+    for result in rank(results):
+        writer.writerow({field: result[field] for field in CSV_FIELDS})
+    return out.getvalue()
+
+
+def format_score(result):
+    if result["score"] is None:
+        return "    -"
+    return f"{result['score']:5.0f}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Score resumes against a job description")
+    parser.add_argument("job_description",
+                        help="text file with the job description")
+    parser.add_argument("resumes",
+                        nargs="+",
+                        help="PDF files, zips of PDFs or directories")
+    parser.add_argument("-c",
+                        "--concurrency",
+                        type=int,
+                        default=SCREENING_CONCURRENCY,
+                        help="resumes analyzed at once")
+    parser.add_argument("-k",
+                        "--top-k",
+                        type=int,
+                        default=SCREENING_TOP_K,
+                        help="best pre-ranked resumes reviewed by the LLM "
+                        "(0 for all)")
+    parser.add_argument("-o",
+                        "--output",
+                        default="screening_results.csv",
+                        help="CSV file for the ranked results")
+    args = parser.parse_args(argv)
+
+    with open(args.job_description, "r", encoding="utf-8") as f:
+        job_description = f.read()
+
+    results = []
+    for result in screen_resumes(read_paths(args.resumes), job_description,
+                                 args.concurrency, args.top_k):
+        results.append(result)
+        print(f"{format_score(result)}  {result['name']}", file=sys.stderr)
+
+    with open(args.output, "w", encoding="utf-8", newline="") as f:
+        f.write(results_to_csv(results))
+    for result in rank(results):
+        print(f"{result['rank']:4d}. {format_score(result)}  {result['name']}")
+
+
+if __name__ == "__main__":
+    main()
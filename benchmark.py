@@ -0,0 +1,312 @@
+"""Latency benchmark of each room's flow against the local fake LLM
+
+Usage: python benchmark.py [-n REQUESTS] [-c CONCURRENCY] [--latency SECONDS]
+
+Every flow runs twice: once with the configured model latency, for end-to-end
+p50/p95/p99 and requests per second, and once with a model that answers
+instantly, whose latency is the app's own overhead.
+"""
+import argparse
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import job_store
+import llm_client
+import moderation
+import resume_analysis
+import resume_scoring
+import rooms
+from context_builder import ConversationContext
+from fake_llm import FakeClient
+from formal_translation import formal_translator, translate_batch
+from mock_interview import (ANSWERING, INTERVIEW_MINUTES, INTERVIEW_QUESTIONS,
+                            InterviewSession)
+from prompts import FORMAL_TRANSLATOR_BATCH, MODERATION, RESUME_SCORING
+from resume_analysis import cached_job_requirements
+from resume_scoring import review_resume
+
+QUESTIONS = [
+    "How do I answer 'tell me about yourself'?",
+    "What are good questions to ask at the end of an interview?",
+    "How should I explain a gap in my resume?",
+    "How do I negotiate my salary offer?",
+    "What is the STAR method?",
+]
+
+HISTORY = [
+    {"role": "user", "content": "I have an interview for a data analyst role."},
+    {"role": "assistant", "content": "Great, let's prepare for it together."},
+    {"role": "user", "content": "They said there will be a SQL test."},
+    {"role": "assistant", "content": "Then let's practise joins and window functions."},
+]
+
+JOB_DESCRIPTIONS = [
+    "Data analyst. SQL, Python and dashboards. 2+ years of experience.",
+    "Backend engineer. Python, PostgreSQL, REST APIs and cloud deployment.",
+    "Marketing coordinator. Campaign planning, social media and reporting.",
+]
+
+RESUME_TEXT = ("Jane Doe, data analyst with three years of experience in SQL, "
+               "Python and Tableau. Built weekly KPI dashboards, automated "
+               "reporting pipelines and led A/B test analysis for marketing.")
+
+SENTENCES = [
+    "Give this to John?",
+    "I need that report, like, yesterday!",
+    "That idea sounds kinda off.",
+    "Can't make it to the meeting, sorry.",
+    "Who broke the build again?",
+    "Send me the numbers when you get a sec.",
+    "This deadline is nuts.",
+    "Nope, not doing that.",
+]
+
+# Scratch directory of a benchmark run, for its job store and interviews
+_work_dir = None
+
+RESUME_REVIEW_REPLY = json.dumps({
+    "is_resume": True,
+    "position": "Data Analyst",
+    "requirements": [
+        {"requirement": "SQL", "importance": "must", "match": 90,
+         "evidence": "Three years of SQL"},
+        {"requirement": "Dashboards", "importance": "must", "match": 80,
+         "evidence": "Weekly KPI dashboards"},
+        {"requirement": "Cloud", "importance": "nice", "match": 20,
+         "evidence": "Not mentioned"},
+    ],
+    "analysis": "Relevant SQL and Python experience.",
+    "suggestions": ["Quantify the dashboard impact."],
+    "ats_reformatting": ["Use standard section headings."],
+    "updated_resume": "Jane Doe, Data Analyst."
+})
+
+
+def respond(messages, kwargs):
+    """Canned replies for requests whose answers are parsed"""
+    system = messages[0]["content"]
+    if system == MODERATION.prefix[0]["content"]:
+        return "True"
+    if system == RESUME_SCORING.prefix[0]["content"]:
+        return RESUME_REVIEW_REPLY
+    if system == FORMAL_TRANSLATOR_BATCH.prefix[0]["content"]:
+        sentences = json.loads(messages[-1]["content"])["sentences"]
+        return json.dumps({
+            "translations": [{
+                "id": s["id"],
+                "alternatives": ["Kindly " + s["text"]] * 3
+            } for s in sentences]
+        })
+    return None
+
+
+def interview_preparation(i):
+    chunks = rooms.generate_response(QUESTIONS[i % len(QUESTIONS)],
+                                     "Interview Preparation",
+                                     stream=True,
+                                     history=HISTORY,
+                                     context=ConversationContext())
+    return "".join(chunks)
+
+
+def resume_help(i):
+    # Repeated questions, served from the answer cache after the first time
+    return rooms.generate_response(QUESTIONS[i % len(QUESTIONS)],
+                                   "Resume Help",
+                                   cached=True)
+
+
+def mock_interview(i):
+    # One answered turn of an interview in progress, through the app's own
+    # InterviewSession. The answer mentions drugs, so local moderation
+    # defers to the LLM
+    interview = InterviewSession(
+        os.path.join(_work_dir, "interviews", f"benchmark{i}.json"), {
+            "status": ANSWERING,
+            "questions": i % INTERVIEW_QUESTIONS,
+            "deadline": time.time() + INTERVIEW_MINUTES * 60,
+            "history": list(HISTORY)
+        })
+    answer = f"I spent {i} months turning drug trial data into decisions."
+    return "".join(map(str, interview.answer(answer, stream=True)))
+
+
+def resume_analysis_flow(i):
+    requirements = cached_job_requirements(
+        JOB_DESCRIPTIONS[i % len(JOB_DESCRIPTIONS)])
+    return review_resume(RESUME_TEXT, requirements).score()
+
+
+def business_english(i):
+    return formal_translator(SENTENCES[i % len(SENTENCES)])
+
+
+def business_english_batch(i):
+    return list(translate_batch(SENTENCES * 5))
+
+
+FLOWS = {
+    "Interview Preparation": interview_preparation,
+    "Resume Help": resume_help,
+    "Mock Interview": mock_interview,
+    "Resume Analysis": resume_analysis_flow,
+    "Business English": business_english,
+    "Business English (batch)": business_english_batch,
+}
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def reset_caches():
+    """Forget cached answers, so each pass starts cold"""
+    shutil.rmtree(_work_dir, ignore_errors=True)
+    job_store.set_store(
+        job_store.JobStore(os.path.join(_work_dir, "job_store")))
+    resume_analysis.clear()
+    rooms.clear()
+    moderation.clear()
+    resume_scoring.clear()
+
+
+def run_flow(flow, requests, concurrency):
+    """Latencies of `requests` runs of a flow, and their wall-clock time"""
+
+    def timed(i):
+        started = time.perf_counter()
+        flow(i)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(timed, range(requests)))
+    return latencies, time.perf_counter() - started
+
+
+def run_pass(flows, client, requests, concurrency, warmup):
+    llm_client.set_backend(lambda api_key: client)
+    reset_caches()
+    results = {}
+    for name, flow in flows.items():
+        for i in range(warmup):
+            flow(i)
+        results[name] = run_flow(flow, requests, concurrency)
+    return results
+
+
+def benchmark(flows=FLOWS,
+              requests=50,
+              concurrency=8,
+              warmup=2,
+              latency=0.3,
+              tokens_per_second=100,
+              completion_tokens=150):
+    """Benchmark each flow, returning a report dict per flow name"""
+    model = FakeClient(latency=latency,
+                       tokens_per_second=tokens_per_second,
+                       completion_tokens=completion_tokens,
+                       respond=respond)
+    instant = FakeClient(latency=0,
+                         tokens_per_second=0,
+                         completion_tokens=completion_tokens,
+                         respond=respond)
+    # Job requirements and interviews go to a scratch directory, not the app's
+    global _work_dir
+    _work_dir = tempfile.mkdtemp(prefix="benchmark_")
+    try:
+        timed = run_pass(flows, model, requests, concurrency, warmup)
+        overhead = run_pass(flows, instant, requests, concurrency, warmup)
+    finally:
+        llm_client.set_backend(None)
+        job_store.set_store(None)
+        shutil.rmtree(_work_dir, ignore_errors=True)
+        _work_dir = None
+
+    report = {}
+    for name in flows:
+        latencies, wall = timed[name]
+        own, _ = overhead[name]
+        report[name] = {
+            "requests": requests,
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p95_ms": percentile(latencies, 95) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+            "overhead_p50_ms": percentile(own, 50) * 1000,
+            "overhead_p95_ms": percentile(own, 95) * 1000,
+            "overhead_p99_ms": percentile(own, 99) * 1000,
+            "requests_per_second": requests / wall,
+        }
+    return report
+
+
+def format_report(report):
+    lines = [
+        f"{'flow':26} {'p50':>8} {'p95':>8} {'p99':>8}   "
+        f"{'overhead p50/p95/p99':>22} {'req/s':>8}"
+    ]
+    for name, r in report.items():
+        overhead = (f"{r['overhead_p50_ms']:.1f}/{r['overhead_p95_ms']:.1f}/"
+                    f"{r['overhead_p99_ms']:.1f}")
+        lines.append(f"{name:26} {r['p50_ms']:8.1f} {r['p95_ms']:8.1f} "
+                     f"{r['p99_ms']:8.1f}   {overhead:>22} "
+                     f"{r['requests_per_second']:8.2f}")
+    lines.append("(latencies in ms)")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the rooms against a local fake LLM")
+    parser.add_argument("-n",
+                        "--requests",
+                        type=int,
+                        default=50,
+                        help="runs of each flow")
+    parser.add_argument("-c",
+                        "--concurrency",
+                        type=int,
+                        default=8,
+                        help="runs of a flow in flight at once")
+    parser.add_argument("--warmup",
+                        type=int,
+                        default=2,
+                        help="untimed runs before each flow")
+    parser.add_argument("--latency",
+                        type=float,
+                        default=0.3,
+                        help="seconds to the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=100)
+    parser.add_argument("--completion-tokens", type=int, default=150)
+    parser.add_argument("--flows",
+                        nargs="+",
+                        choices=sorted(FLOWS),
+                        default=list(FLOWS),
+                        metavar="FLOW",
+                        help="flows to run, by name")
+    parser.add_argument("--json",
+                        action="store_true",
+                        help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = benchmark({name: FLOWS[name] for name in args.flows},
+                       args.requests, args.concurrency, args.warmup,
+                       args.latency, args.tokens_per_second,
+                       args.completion_tokens)
+    if args.json:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        print(format_report(report))
+
+
+if __name__ == "__main__":
+    main()
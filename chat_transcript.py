@@ -0,0 +1,70 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import streamlit as st
+
+# Messages shown at first, and added by each "Show earlier messages" click
+TRANSCRIPT_WINDOW = int(os.getenv("TRANSCRIPT_WINDOW", "30"))
+
+# Rendered bubbles kept across reruns and sessions
+BUBBLE_CACHE_SIZE = int(os.getenv("BUBBLE_CACHE_SIZE", "4096"))
+
+_bubbles = OrderedDict()
+_bubbles_lock = threading.Lock()
+
+
+def message_id(message):
+    """Stable id of a message: its own "id" if set, else a content hash"""
+    if isinstance(message, dict):
+        if "id" in message:
+            return str(message["id"])
+        content = f"{message['role']}\0{message['content']}"
+    else:
+        content = repr(message)
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+def bubble_html(message, render):
+    """render(message), cached by renderer and message id"""
+    key = (render.__module__, render.__qualname__, message_id(message))
+    with _bubbles_lock:
+        html = _bubbles.get(key)
+        if html is not None:
+            _bubbles.move_to_end(key)
+            return html
+    html = render(message)
+    with _bubbles_lock:
+        _bubbles[key] = html
+        while len(_bubbles) > BUBBLE_CACHE_SIZE:
+            _bubbles.popitem(last=False)
+    return html
+
+
+def render_transcript(messages, key, render, more=False,
+                      window=TRANSCRIPT_WINDOW):
+    """Render only the newest messages of a chat
+
+    The visible window goes out as a single markdown element assembled from
+    cached bubbles, so a rerun costs the same however long the chat gets.
+    `more` says whether messages older than `messages` exist elsewhere.
+    Returns True when the user asked for more messages than `messages` has,
+    so the caller can load an earlier page.
+    """
+    shown_key = f"transcript_shown_{key}"
+    shown = st.session_state.setdefault(shown_key, window)
+    visible = messages[-shown:] if shown < len(messages) else messages
+    wants_more = False
+
+    if (len(visible) < len(messages) or more) and st.button(
+            "Show earlier messages", key=f"transcript_more_{key}"):
+        st.session_state[shown_key] = shown + window
+        wants_more = shown + window > len(messages)
+        if not wants_more:
+            st.rerun()
+
+    if visible:
+        st.markdown("".join(bubble_html(m, render) for m in visible),
+                    unsafe_allow_html=True)
+    return wants_more
@@ -1,193 +1,149 @@
 import streamlit as st
-from openai import OpenAI
-import json
-import os
-from datetime import datetime, timedelta
-from PyPDF2 import PdfReader
-
-# Set up your OpenAI API key
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-# Files to store chat histories
-HISTORY_FILES = {
-    "Interview Preparation": "interview_prep_history.json",
-    "Mock Interview": "mock_interview_history.json",
-    "Resume": "resume_history.json",
-    "Conversation": "conversation_history.json",
-    "Resume Help": "resume_help_history.json",
-    "Resume Analysis": "resume_analysis_history.json",
-    "Workplace Tips": "workplace_tips_history.json",
-    "Business English": "business_english_history.json"
+import time
+from chat_transcript import render_transcript
+from context_builder import ConversationContext
+from batch_screening import (SCREENING_CONCURRENCY, SCREENING_TOP_K, rank,
+                             results_to_csv, screen_resumes)
+from history_store import HistoryStore, new_session_id
+import llm_metrics
+from formal_translation import formal_translator
+from resume_analysis import prepare_analysis
+from resume_scoring import DEFAULT_WEIGHTS, review_resume
+from mock_interview import EXPIRED, InterviewSessions
+from rooms import generate_response, get_response_cache
+
+# Minimum seconds between redraws of a streaming response
+STREAM_RENDER_INTERVAL = 0.05
+
+# Rooms whose replies see the earlier conversation; the others treat each
+# query independently
+STATEFUL_ROOMS = {
+    "Interview Preparation", "Workplace Tips", "Mock Interview (Question)",
+    "Mock Interview (Feedback)"
 }
 
-# Set the model to use
-MODEL = "gpt-4o-mini"  # Change this to your desired model, e.g., "gpt-4-0125-preview" for GPT-4 Turbo
-
-# Custom prompts for each room
-CUSTOM_PROMPTS = {
+ROOM_DESCRIPTIONS = {
     "Interview Preparation":
-    """
-You are an experienced HR.
-If asked about potential interviewer questions, provide recent examples and formal answers.
-For specific interview questions, offer a structured answer format and an example response. You may also provide an answer template for the user.  You should also analyze the question and explain what the questions is actually looking for, and the reason behind that question.
-If a question is unlikely to be asked, state that clearly.
-When users provide their answers, evaluate them and suggest improvements.
-Only respond to interview-related queries
-
-User Query: {user_input}
-
-Your response:
-""",
-    "Mock Interview (Question)":
-    """
-        Question description: {user_input}
-
-    You are an  professional HR conducting a mock interview. Based on the conversation history, ask the next relevant interview question. The question type should align with the question description given. Try to ask more variety of questions, do not stick only to the most commons questions.
+    "Get expert advice on common interview questions, strategies, and tips to ace your next job interview.",
+    "Mock Interview":
+    "Practice your interview skills with our AI interviewer and receive personalized feedback to improve your performance.",
+    "Resume Help":
+    "Get assistance on creating and optimizing your resume to increase your chances of landing an interview.",
+    "Resume Analysis":
+    "Upload your resume and receive detailed feedback and suggestions for improvement.",
+    "Workplace Tips":
+    "Get valuable insights and advice on workplace dynamics and professional relationships.",
+    "Business English":
+    "Improve your business English skills with tips on communication, writing, and professionalism."
+}
 
 
-    """,
-    "Mock Interview (Feedback)":
-    """
-You are an HR professional who has just conducted a mock interview. Based on the conversation history, provide constructive feedback on the each of the interviewee's answers to the interviewer's question. 
+@st.cache_resource
+def get_history_store():
+    """Process-wide store shared by all Streamlit sessions"""
+    return HistoryStore()
 
-    Follow this format:
-    Overall Performance:
-    Strengths: 
-    - <Strengths displayed by users in the interview>
-    - <Strengths displayed by users in the interview>
-    - <Strengths displayed by users in the interview>
 
-    Weaknesses:
-    - <Weaknesses displayed by users in the interview>
-    - <Weaknesses displayed by users in the interview>
-    - <Weaknesses displayed by users in the interview>
+@st.cache_resource
+def get_interview_sessions():
+    """Mock interviews of all Streamlit sessions, run on the server"""
+    return InterviewSessions()
 
-    Suggestions for Improvement Overall: 
-    <Overall suggestions for improvement>
 
-    <Compliement user for a good try and  encourage to try again and improve!>
+def get_interview():
+    """This session's mock interview"""
+    return get_interview_sessions().get(get_session_id())
 
 
-""",
-    "Resume":
-    """
-You are an AI assistant specialized in resume building and optimization. Your name is emploweeeee+.
-Provide expert advice on creating and improving resumes. Focus on:
-- Resume structure and formatting
-- Effective ways to highlight skills and achievements
-- Industry-specific resume tips
-- Strategies for tailoring resumes to specific job descriptions
-Treat each query independently, offering clear and actionable advice.
+def get_session_id():
+    """Session id kept in the URL, so a page refresh resumes the histories"""
+    if 'session_id' not in st.session_state:
+        session_id = st.query_params.get("session", "")
+        if not session_id.isalnum():
+            session_id = new_session_id()
+            st.query_params["session"] = session_id
+        st.session_state.session_id = session_id
+    return st.session_state.session_id
 
-Try to keep the response to a maximum of 80 words.
-Give simplified answers.
 
-User Query: {user_input}
+def load_chat_history(room, before=None):
+    """Load the page of a room's history preceding position `before`
 
-Your response:
-""",
-    "Resume Help":
+    Returns (messages, start); with `before` unset the newest page is loaded.
     """
-    You are an AI assistant specializing in resume help. Your name is emploweeeee+.
-    Provide expert advice on creating and improving resumes. Focus on:
-    - Resume structure and formatting
-    - Effective ways to highlight skills and achievements
-    - Industry-specific resume tips
-    - Strategies for tailoring resumes to specific job descriptions
-    Treat each query independently, offering clear and actionable advice.
+    if room == "Mock Interview":
+        return list(get_interview().history), 0
+    return get_history_store().load_page(get_session_id(), room, before)
 
-    User Query: {user_input}
 
-    Your response:
-    """,
-    "Resume Analysis":
-    """
-    You are an AI assistant specializing in resume analysis. Your name is emploweeeee+.
-    Analyze the provided resume information and offer detailed feedback. Focus on:
-    - Strengths and weaknesses of the resume
-    - Suggestions for improvement
-    - Industry-specific recommendations
-    - Alignment with current job market trends
-    Provide constructive and actionable feedback for each query.
+def save_chat_history(history, room):
+    """Replace the whole history of a room"""
+    if room == "Mock Interview":
+        get_interview().restore(history)
+    else:
+        get_history_store().replace(get_session_id(), room, history)
 
-    User Query: {user_input}
 
-    Your response:
-    """,
-    "Workplace Tips":
-    """
-    You are a workplace guide and conversation assistant for new worker to get familiar to their workplace environment and get closer to the other employees.
-    The formality depends on the situation and the position of the person talking to.
-    The format must be in a conversation face-to-face instead of sending mail or message unless state otherwise.
-    If the topic not related to conversation in workplace, refuse to answer.
+def append_chat_message(message, room):
+    """Append one message to a room's history"""
+    get_history_store().append(get_session_id(), room, message)
 
-    User Query: {user_input}
 
-    Your response:
-    """,
-    "Business English":
-    """
-    You are an AI assistant specializing in Business English. Your name is emploweeeee+.
-    Help users improve their business English skills with tips on communication, writing, and professionalism. Focus on:
-    - Formal business writing techniques
-    - Common business idioms and phrases
-    - Email etiquette
-    - Presentation and public speaking tips
-    Offer clear explanations and examples for each query.
+def get_conversation_context(room):
+    """This session's rolling summary for a room"""
+    contexts = st.session_state.setdefault('conversation_contexts', {})
+    if room not in contexts:
+        contexts[room] = ConversationContext()
+    return contexts[room]
 
-    User Query: {user_input}
 
-    Your response:
-    """
-}
+def reset_conversation_context(room):
+    """Forget a room's rolling summary, e.g. when its history is replaced"""
+    st.session_state.setdefault('conversation_contexts', {}).pop(room, None)
 
-ROOM_DESCRIPTIONS = {
-    "Interview Preparation":
-    "Get expert advice on common interview questions, strategies, and tips to ace your next job interview.",
-    "Mock Interview":
-    "Practice your interview skills with our AI interviewer and receive personalized feedback to improve your performance.",
-    "Resume Help":
-    "Get assistance on creating and optimizing your resume to increase your chances of landing an interview.",
-    "Resume Analysis":
-    "Upload your resume and receive detailed feedback and suggestions for improvement.",
-    "Workplace Tips":
-    "Get valuable insights and advice on workplace dynamics and professional relationships.",
-    "Business English":
-    "Improve your business English skills with tips on communication, writing, and professionalism."
-}
 
+def chat_bubble(message):
+    """HTML for a single chat message"""
+    if message["role"] == "user":
+        return f"""
+                <div class='chat-bubble user-bubble'>
+                    <img src='https://brandeps.com/icon-download/U/User-icon-21.png' class='avatar'>
+                    <div class='message-content'>{message['content']}</div>
+                </div>
+                """
+    return f"""
+                <div class='chat-bubble assistant-bubble'>
+                    <img src='https://static.thenounproject.com/png/1610456-200.png' class='avatar'>
+                    <div class='message-content'>{message['content']}</div>
+                </div>
+                """
 
-@st.cache_data
-def load_chat_history(room):
-    if room == "Mock Interview":
-        return st.session_state.get('mock_interview_history', [])
-    elif os.path.exists(HISTORY_FILES.get(room, "")):
-        with open(HISTORY_FILES[room], "r") as f:
-            return json.load(f)
-    return []
 
+def assistant_bubble(text):
+    return chat_bubble({"role": "assistant", "content": text})
 
-def save_chat_history(history, room):
-    if room == "Mock Interview":
-        st.session_state['mock_interview_history'] = history
-    else:
-        with open(HISTORY_FILES[room], "w") as f:
-            json.dump(history, f)
 
+def stream_markdown(chunks, render=str):
+    """Render streamed text into one placeholder as it arrives
 
-def generate_response(prompt, room):
+    `render` turns the text so far into the HTML to show. Returns the full
+    text once the stream ends. If the stream fails, whatever arrived before
+    the failure stays shown and the error is raised, for the caller to
+    show without saving the partial reply.
+    """
+    placeholder = st.empty()
+    parts = []
+    last_render = 0
     try:
-        response = client.chat.completions.create(
-            model=MODEL,
-            messages=[{
-                "role": "system",
-                "content": CUSTOM_PROMPTS[room].format(user_input=prompt)
-            }],
-            temperature=1.2)
-        return response.choices[0].message.content
-    except Exception as e:
-        st.error(f"An error occurred: {e}")
-        return e
+        for chunk in chunks:
+            parts.append(chunk)
+            if time.monotonic() - last_render >= STREAM_RENDER_INTERVAL:
+                placeholder.markdown(render("".join(parts)),
+                                     unsafe_allow_html=True)
+                last_render = time.monotonic()
+    finally:
+        placeholder.markdown(render("".join(parts)), unsafe_allow_html=True)
+    return "".join(parts)
 
 
 def export_chat_history(history):
@@ -233,172 +189,101 @@ def import_chat_history(content):
     return history
 
 
-def check_appropriate(input):
-    response = client.chat.completions.create(model=MODEL,
-                                              messages=[{
-                                                  "role":
-                                                  "system",
-                                                  "content":
-                                                  """
-            You are a interview supervisor.Youare to checks if the user's answer is appropriate or not in terms of rudeness, innapropriate topics mentioned, use of profanity or anything that is unacceptable in an interview. Examples
-
-             1. **Curse Words**: Identify and flag any explicit language (e.g., f***, s***, etc.).
-             2. **Criminal Behavior**: Look for phrases that imply illegal activities (e.g., theft, drug use).
-             3. **Disrespectful Speech**: Highlight language that is derogatory or demeaning toward individuals or groups.
-             ...
-             ...
-
-             Do not flag phrases that may have negative connotations but are not explicitly harmful or offensive, such as "pulling all-nighters" or similar expressions, unless they directly indicate disrespect or negativity toward others.
-
-              If the input is appropriate, respond with 'True'. If the input is not appropriate, respond with 'False'.
-             """
-                                              }, {
-                                                  "role": "user",
-                                                  "content": input
-                                              }])
-    return response.choices[0].message.content
-
-
-def extreme_warning(input):
-    response = client.chat.completions.create(model=MODEL,
-                                              messages=[{
-                                                  "role":
-                                                  "system",
-                                                  "content":
-                                                  """
-             You are a strict disciplinary teacher who specializes in interviews. You are to warn and scold user based on their innapropriate inputs.
-
-             You should reply in the format of: 
-
-             <warning emoji>MOCK TEST STOPPED!!!
-
-             Reason~
-             <Reason for stopping the mock test, due to users' behaviour>
-
-             WARNING:
-             <Give warning to users about the use of extreme words, innapropriate topics, etc.>
-
-             <Explain possible consequences>
-
-             <Explain how to avoid the same behaviour in the future>
-            """
-                                              }, {
-                                                  "role": "user",
-                                                  "content": input
-                                              }])
-    return response.choices[0].message.content
-
-
-def get_next_interview_question(num, history):
-    if num == 0:
-        prompt = "Greet the user and Ask user about what profession/industry he is working towards and the position he wishes to apply for in the company"
-    elif num == 1:
-        prompt = "Ask user some relevant general questions to test user's observation, creativity and self-awareness."
-    elif num <= 2:
-        prompt = "ask user some relevant industry specific questions  to  test user knowledge and skills in that industry"
-    elif num == 3:
-        prompt = "Ask user a compeltely random question that tests user quick and critical thinking"
-    elif num <= 6:
-        prompt = "Ask user some relevant behavioural questions to test user's problem solving skills in different scenarios"
-    else:
-        prompt = "Ask user some cultural/motivation/Future goals questions"
-
-    return generate_response(prompt, "Mock Interview (Question)")
-
-
-def get_interview_feedback(history):
-    prompt = "Provide constructive feedback on the interviewee's performance."
-    return generate_response(prompt, "Mock Interview (Feedback)")
+def batch_screening_panel(job_description):
+    """Resume Analysis for many resumes against one job description"""
+    st.markdown(
+        f"<h5 style='color: black; padding:0px;margin:0px;'><b>Upload Resumes (PDFs or a zip of PDFs):</b></h5>",
+        unsafe_allow_html=True)
+    uploaded_files = st.file_uploader('',
+                                      type=['pdf', 'zip'],
+                                      accept_multiple_files=True,
+                                      key="batch_resumes")
+    concurrency = st.slider("Resumes analyzed at once", 1, 32,
+                            SCREENING_CONCURRENCY)
+    top_k = st.number_input(
+        "Best matches given a full analysis (0 for all)",
+        min_value=0,
+        value=SCREENING_TOP_K,
+        help="Resumes are first ranked by their keyword match with the job "
+        "requirements; only the best ones are analyzed in full.")
+    table = st.empty()
+
+    if st.button('Screen Resumes'):
+        if not job_description:
+            st.error("Please enter a job description")
+        elif not uploaded_files:
+            st.error("Please upload resume files")
+        else:
+            results = []
+            files = ((f.name, f.getvalue()) for f in uploaded_files)
+            try:
+                with st.spinner('Screening resumes...'):
+                    for result in screen_resumes(files, job_description,
+                                                 concurrency, top_k):
+                        results.append(result)
+                        table.dataframe(screening_rows(results),
+                                        hide_index=True)
+            except Exception as e:
+                st.error(f"An error occurred during screening: {str(e)}")
+            st.session_state.screening_results = results
+
+    results = st.session_state.get('screening_results')
+    if results:
+        table.dataframe(screening_rows(results), hide_index=True)
+        st.download_button(label="Download Results (CSV)",
+                           data=results_to_csv(results),
+                           file_name="screening_results.csv",
+                           mime="text/csv")
+
+
+def resume_review_panel(review):
+    """Score and analysis of one resume, rescored as the weights change"""
+    weights = {}
+    if review.requirements:
+        must, nice = st.columns(2)
+        weights["must"] = must.slider("Weight of required skills", 0.0, 5.0,
+                                      DEFAULT_WEIGHTS["must"], 0.5)
+        weights["nice"] = nice.slider("Weight of preferred skills", 0.0, 5.0,
+                                      DEFAULT_WEIGHTS["nice"], 0.5)
+    score = review.score(weights)
+
+    st.markdown(f"<h3 style='color: black;'>Resume Match Score:</h3>",
+                unsafe_allow_html=True)
+    st.markdown(f"<h1 style='color: black;'>{int(score)}%</h1>",
+                unsafe_allow_html=True)
+    st.progress(score / 100)
+    if review.requirements:
+        st.dataframe(requirement_rows(review), hide_index=True)
+    st.markdown(f"<h5 style='color: black;'>{review.as_markdown()}</h5>",
+                unsafe_allow_html=True)
 
 
-# Functions from resumeconst.py
-def readpdf(pdf_file):
-    """Read PDF file and extract text"""
-    reader = PdfReader(pdf_file)
-    text = ''
-    for page in reader.pages:
-        text += str(page.extract_text())
-    return text
+def usage_rows(totals):
+    return [{
+        "Room": t["room"] or "-",
+        "LLM calls": t["calls"] - t["answered_locally"],
+        "Answered locally": t["answered_locally"],
+        "Tokens": t["prompt_tokens"] + t["completion_tokens"],
+        "Cost (USD)": round(t["cost_usd"], 4)
+    } for t in sorted(totals, key=lambda t: t["cost_usd"], reverse=True)]
 
 
-def analyze_with_openai(messages):
-    """Generic function to interact with OpenAI API"""
-    try:
-        response = client.chat.completions.create(model="gpt-4o-mini",
-                                                  messages=messages,
-                                                  max_tokens=1000)
-        return response.choices[0].message.content.strip()
-    except Exception as e:
-        st.error(f"Error communicating with OpenAI: {str(e)}")
-        return None
-
-
-def analyze_job_requirements(job_description):
-    """Analyze job description and extract requirements"""
-    messages = [{
-        "role":
-        "system",
-        "content":
-        """
-        As a professional HR Manager with 20 years of experience:
-        Analyze this job description and extract job requirements.
-        If the description is minimal, generate appropriate general requirements.
-        Return the job position name and requirements only.
-        """
-    }, {
-        "role": "user",
-        "content": f"Job Description:\n{job_description}"
-    }]
-    return analyze_with_openai(messages)
-
-
-def analyze_resume(resume_text, job_requirements):
-    """Analyze resume against job requirements"""
-    if len(resume_text) < 100:
-        return "The File is not in ATS format, Please provide an ATS format resume"
-
-    messages = [{
-        "role":
-        "system",
-        "content":
-        """
-        As a professional HR Manager with 20 years of experience:
-        Analyze this Resume and confirm if it is a resume.
-        If yes, analyze it against the Job Requirements.
-        Respond in the following strict format:
-
-        1. *Resume Analysis*: [Provide analysis of the resume]
-        2. *Suggestions to Improve*: [Suggestions to improve the resume for the specific job.]
-        3. *ATS Reformatting*: [Reformatting suggestions to improve ATS readability of the Resume.]
-        4. *Updated Resume*: [Provide the updated resume in ATS format.]
-        SCORE:[A number range from 0 to 100, or 0 if the resume is not relevant.]
-        If it is not a Resume, just output it is not a resume.
-        """
-    }, {
-        "role":
-        "user",
-        "content":
-        f"Resume:\n{resume_text}\n\nJob Requirements:\n{job_requirements}"
-    }]
-    return analyze_with_openai(messages)
-
-
-def extract_score(analyze_result):
-    """Extract numerical score from analysis result"""
-    try:
-        for line in analyze_result.split('\n'):
-            if line.startswith('SCORE:'):
-                score_str = line.replace('SCORE:', '').strip()
-                return float(score_str)
-        return 0
-    except:
-        return 0
+def requirement_rows(review):
+    return [{
+        "Requirement": r.requirement,
+        "Importance": "Required" if r.importance == "must" else "Preferred",
+        "Match (%)": r.match,
+        "Evidence": r.evidence
+    } for r in review.requirements]
 
 
-def extract_suggestions(analyze_result):
-    """Extract suggestions removing the score line"""
-    return '\n'.join(line for line in analyze_result.split('\n')
-                     if not line.startswith('SCORE:'))
+def screening_rows(results):
+    return [{
+        "Rank": r["rank"],
+        "Resume": r["name"],
+        "Score": r["score"],
+        "Keyword match": r["match"]
+    } for r in rank(results)]
 
 
 def main():
@@ -478,88 +363,6 @@ def main():
     """,
                 unsafe_allow_html=True)
 
-    def formal_translator(prompt):
-        system_prompt = """
-      Transform a informal or casual sentences into 3 professional language suitable for workplace communication.
-
-      - Focus on maintaining professionalism and clarity in the revised sentences.
-      - Avoid using slang, overly casual language, or ambiguous phrases.
-      - Ensure that the core message of the original sentence is preserved.
-      - Ensure that any sensitive or culturally specific terms are treated with respect and professionalism.
-      - Maintain the formality level consistent with typical workplace communication guidelines.
-
-      # Steps
-      1. Analyze the provided sentence to understand its core message.
-      2. Identify any informal or casual language that needs to be transformed.
-      3. Rewrite the sentence using professional language, ensuring clarity and appropriateness for a workplace setting.
-      4. Review the transformed sentence to ensure the core message is intact, simple and professional.
-      5. Convert negative sentences to positive messages
-
-      # Output Format
-      - The output should be 3 single, professionally rewritten sentences each separated by an empty line.
-      - Maintain clarity and conciseness in the revised sentence.
-
-      Example:
-      
-      (1) <alternative 1>
-      
-      (2) <alternative 2>
-      
-      (3) <alternative 3>
-
-      
-      """
-
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{
-                "role": "system",
-                "content": system_prompt
-            }, {
-                "role": "user",
-                "content": "Give this to John?"
-            }, {
-                "role":
-                "assistant",
-                "content":
-                """
-                  (1) Could you please kindly help me to hand the documents to John? <br>
-                  (2) Please pass this document to John. <br>
-                  (3) Please hand this over to John. <br>
-                  """
-            }, {
-                "role": "user",
-                "content": "I need that report, like, yesterday!"
-            }, {
-                "role":
-                "assistant",
-                "content":
-                """
-                  (1) Could you please prioritize and send me the report as soon as possible? <br>
-                  (2) I would greatly appreciate it if you could provide that report at your earliest convenience. <br>
-                  (3) I would appreciate it if you could expedite the delivery of that report. Thank you for your prompt attention to this matter. <br>
-                  """
-            }, {
-                "role": "user",
-                "content": "That idea sounds kinda off."
-            }, {
-                "role":
-                "assistant",
-                "content":
-                """
-                  (1) I have some reservations about that idea, but we can have a try on it. <br>
-                  (2) It may be beneficial to reconsider that idea for improved alignment with our objectives. <br>
-                  (3) I believe we should explore alternative approaches, as this idea may not fully meet our expectations.
-                  """
-            }, {
-                "role": "user",
-                "content": prompt
-            }],
-            temperature=1.3,
-            max_tokens=1000,
-        )
-        return response.choices[0].message.content
-
     # Navigation buttons
     col1, col2, col3, col4, col5, col6 = st.columns(6)
     with col1:
@@ -588,7 +391,6 @@ def main():
     room = st.session_state.room
     st.markdown(f"""
     <h2 style="color:black"> Current Room: {room} </h2>
-    <h4 style="color:coral">Chat clears as you refresh the page. Please download a copy of your chat history before refreshing.</h4>
     """,
                 unsafe_allow_html=True)
 
@@ -599,24 +401,13 @@ def main():
     """,
                 unsafe_allow_html=True)
 
-    # Initialize session state for chat histories if they don't exist
+    # Load a room's history the first time it is opened in this session
     if 'chat_histories' not in st.session_state:
-        st.session_state.chat_histories = {
-            r: load_chat_history(r)
-            for r in HISTORY_FILES.keys()
-        }
-
-    # Initialize mock interview state
-    if 'mock_interview_state' not in st.session_state:
-        st.session_state.mock_interview_state = {
-            'started': False,
-            'end_time': None,
-            'question_count': 0,
-            'max_questions': 5,
-            'feedback_given': False
-        }
-    if 'mock_interview_history' not in st.session_state:
-        st.session_state.mock_interview_history = []
+        st.session_state.chat_histories = {}
+        st.session_state.history_starts = {}
+    if room not in st.session_state.chat_histories:
+        (st.session_state.chat_histories[room],
+         st.session_state.history_starts[room]) = load_chat_history(room)
 
     # Sidebar for utility functions
     with st.sidebar:
@@ -625,7 +416,7 @@ def main():
         if st.download_button(
                 label="Download Chat History",
                 data=export_chat_history(
-                    st.session_state.mock_interview_history if room ==
+                    get_interview().history if room ==
                     "Mock Interview" else st.session_state.chat_histories[room]
                 ),
                 file_name=f"{room.lower().replace(' ', '_')}_chat_history.txt",
@@ -635,130 +426,89 @@ def main():
 
         if st.button("Clear Chat History"):
             if room == "Mock Interview":
-                st.session_state.mock_interview_history = []
+                get_interview().clear()
             else:
                 st.session_state.chat_histories[room] = []
-                save_chat_history([], room)
+                st.session_state.history_starts[room] = 0
+                get_history_store().clear(get_session_id(), room)
+                reset_conversation_context(room)
             st.success("Chat history cleared!")
             st.rerun()
 
+        st.toggle("Stream responses", value=True, key="stream_responses")
+        if st.toggle("Reuse answers to common questions",
+                     key="reuse_answers"):
+            stats = get_response_cache().stats()
+            st.caption(f"Answer cache: {stats['hits']} exact and "
+                       f"{stats['semantic_hits']} similar hits, "
+                       f"{stats['misses']} misses")
+
+        with st.expander("Token usage (all sessions)"):
+            st.dataframe(usage_rows(llm_metrics.totals()), hide_index=True)
+
         uploaded_file = st.file_uploader("Import Chat History", type="txt")
         if uploaded_file is not None:
             content = uploaded_file.getvalue().decode("utf-8")
             imported_history = import_chat_history(content)
             if st.button("Restore Imported Chat History"):
                 st.session_state.chat_histories[room] = imported_history
+                st.session_state.history_starts[room] = 0
                 save_chat_history(imported_history, room)
+                reset_conversation_context(room)
                 st.success("Chat history restored!")
                 st.rerun()
 
     # User input and chat logic
+    stream = st.session_state.stream_responses
+    cached = st.session_state.reuse_answers
     if room == "Mock Interview":
+        interview = get_interview()
         # Display chat history for Mock Interview
-        for message in st.session_state.mock_interview_history:
-            if message["role"] == "user":
-                st.markdown(f"""
-                <div class='chat-bubble user-bubble'>
-                    <img src='https://brandeps.com/icon-download/U/User-icon-21.png' class='avatar'>
-                    <div class='message-content'>{message['content']}</div>
-                </div>
-                """,
-                            unsafe_allow_html=True)
+        render_transcript(list(interview.history), room, chat_bubble)
+
+        def show(chunks):
+            if stream:
+                stream_markdown(chunks, assistant_bubble)
             else:
-                st.markdown(f"""
-                <div class='chat-bubble assistant-bubble'>
-                    <img src='https://static.thenounproject.com/png/1610456-200.png' class='avatar'>
-                    <div class='message-content'>{message['content']}</div>
-                </div>
-                """,
+                st.markdown(assistant_bubble("".join(map(str, chunks))),
                             unsafe_allow_html=True)
 
-        if not st.session_state.mock_interview_state['started']:
-            if st.button("Start New Mock Interview"):
-                st.session_state.mock_interview_history = []
-                st.session_state.mock_interview_state = {
-                    'started': True,
-                    'end_time': datetime.now() + timedelta(minutes=20),
-                    'question_count': 0,
-                    'max_questions': 4,
-                    'feedback_given': False
-                }
-                question = get_next_interview_question(
-                    st.session_state.mock_interview_state["question_count"],
-                    [])
-                st.session_state.mock_interview_history.append({
-                    "role":
-                    "assistant",
-                    "content":
-                    question
-                })
-                st.session_state.mock_interview_state['question_count'] += 1
-                st.rerun()
-
-        if st.session_state.mock_interview_state['started']:
-            # Display timer
-            remaining_time = st.session_state.mock_interview_state[
-                'end_time'] - datetime.now()
-            if remaining_time.total_seconds() > 0:
-                minutes, seconds = divmod(remaining_time.seconds, 60)
-                st.markdown(
-                    f"<div class='timer'>Time Remaining: {minutes:02d}:{seconds:02d}</div>",
-                    unsafe_allow_html=True)
-            else:
+        running = interview.running()
+        if not running:
+            if interview.status == EXPIRED:
                 st.markdown("<div class='timer'>Time's Up!</div>",
                             unsafe_allow_html=True)
-                st.session_state.mock_interview_state['started'] = False
+            if st.button("Start New Mock Interview"):
+                try:
+                    show(interview.start(stream))
+                except Exception as e:
+                    st.error(f"An error occurred: {e}")
+                else:
+                    st.rerun()
+        else:
+            # The deadline is kept by the server, so it survives a refresh
+            minutes, seconds = divmod(int(interview.remaining()), 60)
+            st.markdown(
+                f"<div class='timer'>Time Remaining: {minutes:02d}:{seconds:02d}</div>",
+                unsafe_allow_html=True)
 
         # Chat input for the mock interview
         user_input = st.chat_input("Your answer here...")
 
-        if user_input and st.session_state.mock_interview_state['started']:
-            st.session_state.mock_interview_history.append({
-                "role":
-                "user",
-                "content":
-                user_input
-            })
-
-            if check_appropriate(user_input) != "True":
-                st.session_state.mock_interview_history.append({
-                    "role":
-                    "assistant",
-                    "content":
-                    extreme_warning(user_input)
-                })
-                st.session_state.mock_interview_state['feedback_given'] = True
-                st.session_state.mock_interview_state['started'] = False
-
-            elif st.session_state.mock_interview_state[
-                    'question_count'] < st.session_state.mock_interview_state[
-                        'max_questions']:
-                next_question = get_next_interview_question(
-                    st.session_state.mock_interview_state["question_count"],
-                    st.session_state.mock_interview_history)
-                st.session_state.mock_interview_history.append({
-                    "role":
-                    "assistant",
-                    "content":
-                    next_question
-                })
-                st.session_state.mock_interview_state['question_count'] += 1
-            elif not st.session_state.mock_interview_state['feedback_given']:
-                feedback = get_interview_feedback(
-                    st.session_state.mock_interview_history)
-                st.session_state.mock_interview_history.append({
-                    "role":
-                    "assistant",
-                    "content":
-                    "Thank you for completing the mock interview. Here's your feedback:\n\n"
-                    + feedback
-                })
-                st.session_state.mock_interview_state['feedback_given'] = True
-                st.session_state.mock_interview_state['started'] = False
-
-            save_chat_history(st.session_state.mock_interview_history,
-                              'Mock Interview')
-            st.rerun()
+        if user_input and running:
+            st.markdown(chat_bubble({
+                "role": "user",
+                "content": user_input
+            }),
+                        unsafe_allow_html=True)
+            try:
+                reply = interview.answer(user_input, stream)
+                if reply is not None:
+                    show(reply)
+            except Exception as e:
+                st.error(f"An error occurred: {e}")
+            else:
+                st.rerun()
 
     elif room == "Business English":
         st.markdown(
@@ -766,10 +516,19 @@ def main():
             unsafe_allow_html=True)
         sentence = st.text_input("")
         if st.button("Translate"):
-            formal = formal_translator(sentence)
-            st.markdown(
-                f"<div style='color: black'><b><u>Alternative sentence</u></b><br>{formal}</div>",
-                unsafe_allow_html=True)
+
+            def render(formal):
+                return f"<div style='color: black'><b><u>Alternative sentence</u></b><br>{formal}</div>"
+
+            try:
+                if stream:
+                    stream_markdown(formal_translator(sentence, stream),
+                                    render)
+                else:
+                    st.markdown(render(formal_translator(sentence)),
+                                unsafe_allow_html=True)
+            except Exception as e:
+                st.error(f"An error occurred: {e}")
 
     elif room == "Resume Analysis":
         st.markdown(
@@ -777,78 +536,83 @@ def main():
             unsafe_allow_html=True)
         job_description = st.text_area('', height=150)
 
-        st.markdown(
-            f"<h5 style='color: black; padding:0px;margin:0px;'><b>Upload Your Resume (Text-based PDF):</b></h5>",
-            unsafe_allow_html=True)
-        uploaded_file = st.file_uploader('', type=['pdf'])
-
-        if st.button('Analyze Resume'):
-            if not job_description:
-                st.error("Please enter a job description")
-            elif not uploaded_file:
-                st.error("Please upload a resume file")
-            else:
-                try:
-                    with st.spinner('Analyzing your resume...'):
-                        resume_text = readpdf(uploaded_file)
-                        job_summary = analyze_job_requirements(job_description)
-                        analyze_result = analyze_resume(
-                            resume_text, job_summary)
-
-                        score = extract_score(analyze_result)
-                        suggestions = extract_suggestions(analyze_result)
-
-                        st.markdown(
-                            f"<h3 style='color: black;'>Resume Match Score:</h3>",
-                            unsafe_allow_html=True)
-                        st.markdown(
-                            f"<h1 style='color: black;'>{int(score)}%</h1>",
-                            unsafe_allow_html=True)
-                        st.progress(score / 100)
-                        st.markdown(
-                            f"<h5 style='color: black;'>{suggestions}</h5>",
-                            unsafe_allow_html=True)
-
-                except Exception as e:
-                    st.error(f"An error occurred during analysis: {str(e)}")
+        if st.toggle("Batch screening", key="batch_screening"):
+            batch_screening_panel(job_description)
+        else:
+            st.markdown(
+                f"<h5 style='color: black; padding:0px;margin:0px;'><b>Upload Your Resume (Text-based PDF):</b></h5>",
+                unsafe_allow_html=True)
+            uploaded_file = st.file_uploader('', type=['pdf'])
+
+            if st.button('Analyze Resume'):
+                if not job_description:
+                    st.error("Please enter a job description")
+                elif not uploaded_file:
+                    st.error("Please upload a resume file")
+                else:
+                    try:
+                        with st.spinner('Analyzing your resume...'):
+                            resume_text, job_summary = prepare_analysis(
+                                uploaded_file, job_description)
+                            st.session_state.resume_review = review_resume(
+                                resume_text, job_summary)
+                    except Exception as e:
+                        st.error(f"An error occurred during analysis: {str(e)}")
+
+            review = st.session_state.get('resume_review')
+            if review:
+                resume_review_panel(review)
 
         st.markdown("</div>", unsafe_allow_html=True)
 
     else:
-        # Display chat history for other rooms
-        for message in st.session_state.chat_histories[room]:
-            if message["role"] == "user":
-                st.markdown(f"""
-                <div class='chat-bubble user-bubble'>
-                    <img src='https://brandeps.com/icon-download/U/User-icon-21.png' class='avatar'>
-                    <div class='message-content'>{message['content']}</div>
-                </div>
-                """,
-                            unsafe_allow_html=True)
-            else:
-                st.markdown(f"""
-                <div class='chat-bubble assistant-bubble'>
-                    <img src='https://static.thenounproject.com/png/1610456-200.png' class='avatar'>
-                    <div class='message-content'>{message['content']}</div>
-                </div>
-                """,
-                            unsafe_allow_html=True)
+        # Display chat history for other rooms; older messages are fetched
+        # a page at a time on request
+        if render_transcript(st.session_state.chat_histories[room],
+                             room,
+                             chat_bubble,
+                             more=st.session_state.history_starts[room] > 0):
+            earlier, start = load_chat_history(
+                room, st.session_state.history_starts[room])
+            st.session_state.chat_histories[room] = (
+                earlier + st.session_state.chat_histories[room])
+            st.session_state.history_starts[room] = start
+            st.rerun()
 
         # General chat input for other rooms
         user_input = st.chat_input("Type your message here...")
 
         if user_input:
             # Store the user input in the chat history
-            st.session_state.chat_histories[room].append({
-                "role": "user",
-                "content": user_input
-            })
-            response = generate_response(user_input, room)
-            st.session_state.chat_histories[room].append({
-                "role": "assistant",
-                "content": response
-            })
-            save_chat_history(st.session_state.chat_histories[room], room)
+            user_message = {"role": "user", "content": user_input}
+            st.session_state.chat_histories[room].append(user_message)
+            append_chat_message(user_message, room)
+            if room in STATEFUL_ROOMS:
+                conversation = dict(
+                    history=st.session_state.chat_histories[room][:-1],
+                    context=get_conversation_context(room),
+                    offset=st.session_state.history_starts[room])
+            else:
+                conversation = {}
+            try:
+                if stream:
+                    st.markdown(chat_bubble(user_message),
+                                unsafe_allow_html=True)
+                    response = stream_markdown(
+                        generate_response(user_input, room, stream, cached,
+                                          **conversation), assistant_bubble)
+                else:
+                    response = generate_response(user_input,
+                                                 room,
+                                                 cached=cached,
+                                                 **conversation)
+            except Exception as e:
+                # The question stays in the history, without an answer
+                st.error(f"An error occurred: {e}")
+                return
+            assistant_message = {"role": "assistant", "content": str(response)}
+            st.session_state.chat_histories[room].append(assistant_message)
+            append_chat_message(assistant_message, room)
             st.rerun()
 
 
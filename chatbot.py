@@ -1,13 +1,18 @@
 from dataclasses import dataclass
 from typing import Literal
+import time
+from types import SimpleNamespace
 import streamlit as st
 
 from langchain import OpenAI
 from langchain.callbacks import get_openai_callback
 from langchain.chains import ConversationChain
-from langchain.chains.conversation.memory import ConversationSummaryMemory
 import streamlit.components.v1 as components
 
+import llm_metrics
+from chat_transcript import render_transcript
+from rolling_memory import RollingSummaryMemory
+
 
 @dataclass
 class Message:
@@ -16,6 +21,22 @@ class Message:
     message: str
 
 
+def message_html(chat):
+    return f"""
+<div class="chat-row 
+    {'' if chat.origin == 'ai' else 'row-reverse'}">
+    <img class="chat-icon" src="static/{
+        'ai_icon.png' if chat.origin == 'ai' 
+                      else 'user_icon.png'}"
+         width=32 height=32>
+    <div class="chat-bubble
+    {'ai-bubble' if chat.origin == 'ai' else 'human-bubble'}">
+        &#8203;{chat.message}
+    </div>
+</div>
+        """
+
+
 def load_css():
     with open("static/styles.css", "r") as f:
         css = f"<style>{f.read()}</style>"
@@ -34,14 +55,26 @@ def initialize_session_state():
         )
         st.session_state.conversation = ConversationChain(
             llm=llm,
-            memory=ConversationSummaryMemory(llm=llm),
+            memory=RollingSummaryMemory(llm=llm),
         )
 
 
 def on_click_callback():
     with get_openai_callback() as cb:
         human_prompt = st.session_state.human_prompt
-        llm_response = st.session_state.conversation.run(human_prompt)
+        started = time.perf_counter()
+        # The label follows the memory's background summaries too
+        with llm_metrics.labels(room="Chatbot"):
+            llm_response = st.session_state.conversation.run(human_prompt)
+        # LangChain calls OpenAI itself, so account for them from its totals
+        llm_metrics.record(
+            st.session_state.conversation.llm.model_name,
+            SimpleNamespace(prompt_tokens=cb.prompt_tokens,
+                            completion_tokens=cb.completion_tokens),
+            time.perf_counter() - started,
+            cost_usd=cb.total_cost,
+            room="Chatbot",
+            function="conversation")
         st.session_state.history.append(Message("human", human_prompt))
         st.session_state.history.append(Message("ai", llm_response))
         st.session_state.token_count += cb.total_tokens
@@ -59,21 +92,7 @@ prompt_placeholder = st.form("chat-form")
 credit_card_placeholder = st.empty()
 
 with chat_placeholder:
-    for chat in st.session_state.history:
-        div = f"""
-<div class="chat-row 
-    {'' if chat.origin == 'ai' else 'row-reverse'}">
-    <img class="chat-icon" src="static/{
-        'ai_icon.png' if chat.origin == 'ai' 
-                      else 'user_icon.png'}"
-         width=32 height=32>
-    <div class="chat-bubble
-    {'ai-bubble' if chat.origin == 'ai' else 'human-bubble'}">
-        &#8203;{chat.message}
-    </div>
-</div>
-        """
-        st.markdown(div, unsafe_allow_html=True)
+    render_transcript(st.session_state.history, "chat", message_html)
 
     for _ in range(3):
         st.markdown("")
@@ -0,0 +1,151 @@
+import os
+import threading
+from functools import lru_cache
+
+import tiktoken
+
+from background import submit
+from llm_client import chat_completion
+from llm_metrics import instrumented
+from prompts import CONVERSATION_SUMMARY
+
+# Tokens of conversation (summary plus recent turns) sent with a request
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+
+SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", "gpt-4o-mini")
+SUMMARY_MAX_TOKENS = int(os.getenv("SUMMARY_MAX_TOKENS", "500"))
+
+# Tokens the chat format adds around every message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+# Characters per token, for estimates when no encoding can be loaded
+CHARS_PER_TOKEN = 4
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def get_encoding():
+    """The summary model's tiktoken encoding, or None if it cannot be loaded
+
+    Loaded on first use rather than at import, as tiktoken may download it.
+    """
+    global _encoding
+    with _encoding_lock:
+        if _encoding is None:
+            try:
+                try:
+                    _encoding = tiktoken.encoding_for_model(SUMMARY_MODEL)
+                except KeyError:
+                    _encoding = tiktoken.get_encoding("o200k_base")
+            except Exception:
+                # E.g. offline; counts are estimated from now on
+                _encoding = False
+    return _encoding or None
+
+
+@lru_cache(maxsize=4096)
+def count_tokens(text):
+    encoding = get_encoding()
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text))
+
+
+def message_tokens(message):
+    return MESSAGE_OVERHEAD_TOKENS + count_tokens(str(message["content"]))
+
+
+def format_turns(turns):
+    return "\n\n".join(f"{m['role'].capitalize()}: {m['content']}"
+                       for m in turns)
+
+
+@instrumented()
+def summarize(summary, turns):
+    """Fold new turns into an existing summary with one LLM call"""
+    user_input = (f"Summary so far:\n{summary or '(none)'}\n\n"
+                  f"New turns:\n{format_turns(turns)}")
+    response = chat_completion(
+        model=SUMMARY_MODEL,
+        messages=CONVERSATION_SUMMARY.messages(user_input),
+        max_tokens=SUMMARY_MAX_TOKENS)
+    return response.choices[0].message.content.strip()
+
+
+class ConversationContext:
+    """Recent turns of a conversation under a token budget
+
+    Turns that no longer fit are folded into a rolling summary. Only turns
+    that newly fell out of the window are summarized, in the background, so
+    the summary is never rebuilt from scratch and never delays a reply; until
+    it is ready, requests carry the previous summary.
+
+    A context used for a single request, whose summary would never be read,
+    is made with `summarize=False`: turns that do not fit are dropped, and
+    `summary`, e.g. one kept by the client, is sent as it is.
+    """
+
+    def __init__(self, budget=CONTEXT_TOKEN_BUDGET, summary="",
+                 summarize=True):
+        self.budget = budget
+        self.summarize = summarize
+        self.summary = summary
+        # Absolute position of the first turn not folded into the summary
+        self.covered = 0
+        self._pending = None
+        self._lock = threading.Lock()
+
+    def build(self, history, offset=0):
+        """Messages to send ahead of a request
+
+        `history` holds the turns from absolute position `offset` onwards,
+        e.g. when only the newest page of a history is loaded.
+        """
+        with self._lock:
+            self._collect()
+            if self.covered > offset + len(history):
+                # The history was cleared or replaced
+                self.summary, self.covered = "", 0
+            summary = self.summary
+
+        remaining = self.budget
+        if summary:
+            summary_message = {
+                "role": "system",
+                "content": f"Summary of the earlier conversation:\n{summary}"
+            }
+            remaining -= message_tokens(summary_message)
+        start = len(history)
+        while start > 0:
+            cost = message_tokens(history[start - 1])
+            if cost > remaining:
+                break
+            remaining -= cost
+            start -= 1
+
+        with self._lock:
+            dropped = history[max(0, self.covered - offset):start]
+            if dropped and self.summarize and self._pending is None:
+                self._pending = (submit(summarize, summary, dropped),
+                                 offset + start)
+
+        recent = [{
+            "role": m["role"],
+            "content": str(m["content"])
+        } for m in history[start:]]
+        return [summary_message, *recent] if summary else recent
+
+    def _collect(self):
+        """Take up a finished background summary"""
+        if self._pending is None or not self._pending[0].done():
+            return
+        future, covered = self._pending
+        self._pending = None
+        try:
+            self.summary = future.result()
+            self.covered = covered
+        except Exception:
+            # Retried with the next request
+            pass
@@ -0,0 +1,176 @@
+"""In-process stand-in for the OpenAI client, for benchmarks and offline runs
+
+Select it with LLM_BACKEND=fake, or llm_client.set_backend for a configured
+instance. Replies are seeded by the request, so the same request always gets
+the same text, and take as long as the configured latency says.
+"""
+import base64
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+FAKE_LLM_LATENCY = float(os.getenv("FAKE_LLM_LATENCY", "0.3"))
+FAKE_LLM_TOKENS_PER_SECOND = float(
+    os.getenv("FAKE_LLM_TOKENS_PER_SECOND", "100"))
+FAKE_LLM_COMPLETION_TOKENS = int(os.getenv("FAKE_LLM_COMPLETION_TOKENS", "150"))
+FAKE_LLM_SEED = int(os.getenv("FAKE_LLM_SEED", "0"))
+
+EMBEDDING_DIMENSIONS = 256
+
+_WORDS = ("the team project role skills interview experience answer "
+          "question clear results customer growth plan feedback strong "
+          "impact example goal lead work communication data").split()
+
+# A 1x1 transparent PNG
+_PNG = base64.b64encode(
+    bytes.fromhex("89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+                  "1f15c4890000000b49444154789c6360000200000500017a5eab3f00"
+                  "00000049454e44ae426082")).decode("ascii")
+
+
+def _request_seed(seed, payload):
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    return seed ^ int.from_bytes(hashlib.sha256(encoded).digest()[:8], "big")
+
+
+def _count_tokens(text):
+    # Close enough to tiktoken for English prose, at no cost
+    return max(1, len(text) // 4)
+
+
+class _Stream:
+    """Iterator of chunk objects shaped like the SDK's stream"""
+
+    def __init__(self, client, tokens, usage=None):
+        self._client = client
+        self._tokens = iter(tokens)
+        self._usage = usage
+        self._first = True
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        token = next(self._tokens, None)
+        if token is None:
+            # Sent last when stream_options asks for usage
+            usage, self._usage = self._usage, None
+            if usage is None:
+                raise StopIteration
+            return SimpleNamespace(choices=[], usage=usage)
+        self._client._wait(self._client.latency if self._first else 0, 1)
+        self._first = False
+        delta = SimpleNamespace(content=token, role="assistant")
+        return SimpleNamespace(choices=[SimpleNamespace(delta=delta)],
+                               usage=None)
+
+    def close(self):
+        self._tokens = iter(())
+        self._usage = None
+
+
+class FakeClient:
+    """Answers chat, embedding and image requests without the network
+
+    `latency` is the time to the first token, after which tokens arrive at
+    `tokens_per_second`. `respond(messages, kwargs)` may return the reply
+    text for a request, or None for seeded filler of `completion_tokens`
+    words. `calls` counts requests and `model_seconds` the simulated time.
+    """
+
+    def __init__(self,
+                 latency=FAKE_LLM_LATENCY,
+                 tokens_per_second=FAKE_LLM_TOKENS_PER_SECOND,
+                 completion_tokens=FAKE_LLM_COMPLETION_TOKENS,
+                 seed=FAKE_LLM_SEED,
+                 respond=None):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.seed = seed
+        self.respond = respond
+        self.calls = 0
+        self.model_seconds = 0.0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(
+            create=self._chat))
+        self.embeddings = SimpleNamespace(create=self._embed)
+        self.images = SimpleNamespace(generate=self._image)
+
+    @classmethod
+    def from_env(cls):
+        return cls()
+
+    def _wait(self, latency, tokens):
+        seconds = latency + (tokens / self.tokens_per_second
+                             if self.tokens_per_second > 0 else 0)
+        with self._lock:
+            self.model_seconds += seconds
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def _count(self):
+        with self._lock:
+            self.calls += 1
+
+    def _reply(self, messages, kwargs):
+        text = self.respond(messages, kwargs) if self.respond else None
+        if text is not None:
+            return text
+        if kwargs.get("response_format", {}).get("type") in ("json_object",
+                                                          "json_schema"):
+            return "{}"
+        rng = random.Random(_request_seed(self.seed, messages))
+        count = min(self.completion_tokens,
+                    kwargs.get("max_tokens") or self.completion_tokens)
+        return " ".join(rng.choice(_WORDS) for _ in range(count))
+
+    def _chat(self, messages, stream=False, stream_options=None, **kwargs):
+        self._count()
+        text = self._reply(messages, kwargs)
+        # One token per word, as in the stream
+        completion_tokens = len(text.split())
+        prompt_tokens = sum(
+            _count_tokens(str(m.get("content", ""))) for m in messages)
+        usage = SimpleNamespace(prompt_tokens=prompt_tokens,
+                                completion_tokens=completion_tokens,
+                                total_tokens=prompt_tokens + completion_tokens)
+        if stream:
+            words = text.split(" ")
+            include_usage = (stream_options or {}).get("include_usage")
+            return _Stream(self, [words[0]] +
+                           [" " + word for word in words[1:]],
+                           usage if include_usage else None)
+        self._wait(self.latency, completion_tokens)
+        message = SimpleNamespace(role="assistant", content=text)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=message, finish_reason="stop")],
+            model=kwargs.get("model"),
+            usage=usage)
+
+    def _embed(self, input, **kwargs):
+        self._count()
+        self._wait(self.latency / 4, 0)
+        inputs = [input] if isinstance(input, str) else list(input)
+        data = []
+        for i, text in enumerate(inputs):
+            rng = random.Random(_request_seed(self.seed, text))
+            embedding = [rng.gauss(0, 1) for _ in range(EMBEDDING_DIMENSIONS)]
+            data.append(SimpleNamespace(index=i, embedding=embedding))
+        tokens = sum(_count_tokens(text) for text in inputs)
+        return SimpleNamespace(data=data,
+                               model=kwargs.get("model"),
+                               usage=SimpleNamespace(prompt_tokens=tokens,
+                                                     total_tokens=tokens))
+
+    def _image(self, prompt, n=1, **kwargs):
+        self._count()
+        self._wait(self.latency * 10, 0)
+        return SimpleNamespace(data=[
+            SimpleNamespace(b64_json=_PNG, url=None, revised_prompt=prompt)
+            for _ in range(n)
+        ])
@@ -0,0 +1,227 @@
+"""Rewrite casual sentences in professional language
+
+Usage: python formal_translation.py INPUT [-o OUTPUT]
+where INPUT is a text document, split into sentences, or a CSV whose first
+column (or --column) holds one sentence per row below a header row (or none,
+with --no-header).
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import openai
+
+from llm_client import chat_completion, chat_completion_stream
+from llm_metrics import instrumented
+from prompts import FORMAL_TRANSLATOR, FORMAL_TRANSLATOR_BATCH
+
+# Sentences packed into one batch request, and requests in flight at once
+TRANSLATION_BATCH_SIZE = int(os.getenv("TRANSLATION_BATCH_SIZE", "20"))
+TRANSLATION_CONCURRENCY = int(os.getenv("TRANSLATION_CONCURRENCY", "4"))
+
+# Completion budget per sentence in a batch: 3 alternatives plus JSON
+TOKENS_PER_SENTENCE = 200
+
+CSV_FIELDS = ["sentence", "translation"]
+
+
+@instrumented(room="Business English")
+def formal_translator(prompt, stream=False):
+    """Rewrite a casual sentence as 3 professional alternatives
+
+    With `stream` set, yields the text as it arrives.
+    """
+    request = chat_completion_stream if stream else chat_completion
+    response = request(
+        model="gpt-4o-mini",
+        messages=FORMAL_TRANSLATOR.messages(prompt),
+        temperature=1.3,
+        max_tokens=1000,
+    )
+    return response if stream else response.choices[0].message.content
+
+
+def split_sentences(text):
+    """Sentences of a document, one per line or ending punctuation"""
+    sentences = []
+    for line in text.splitlines():
+        sentences.extend(s.strip()
+                         for s in re.split(r"(?<=[.!?])\s+", line)
+                         if s.strip())
+    return sentences
+
+
+def format_alternatives(alternatives):
+    """Alternatives laid out like formal_translator's own answers"""
+    return " <br>\n".join(f"({i}) {alternative}"
+                          for i, alternative in enumerate(alternatives, 1))
+
+
+@instrumented(room="Business English", function="translate_batch")
+def _translate_chunk(sentences):
+    """Translations of a chunk of sentences, in one request where possible
+
+    Each entry of the batch answer is checked on its own. Sentences it
+    leaves out or garbles, or all of them if the batch request fails, are
+    translated one at a time instead, so a bad reply never loses input.
+    """
+    payload = json.dumps({
+        "sentences": [{"id": i, "text": s} for i, s in enumerate(sentences)]
+    })
+    try:
+        response = chat_completion(
+            model="gpt-4o-mini",
+            messages=FORMAL_TRANSLATOR_BATCH.messages(payload),
+            response_format={"type": "json_object"},
+            temperature=1.0,
+            max_tokens=TOKENS_PER_SENTENCE * len(sentences),
+        )
+        items = _batch_items(response.choices[0].message.content)
+    except openai.OpenAIError:
+        items = []
+    translations = {}
+    for item in items:
+        parsed = _batch_item(item, len(sentences))
+        if parsed is not None:
+            translations[parsed[0]] = format_alternatives(parsed[1])
+    return [
+        translations.get(i) or _translate_one(sentence)
+        for i, sentence in enumerate(sentences)
+    ]
+
+
+def _batch_items(content):
+    """The entries of a batch reply, or none if it is not the expected JSON"""
+    try:
+        items = json.loads(content)["translations"]
+    except (ValueError, KeyError, TypeError):
+        return []
+    return items if isinstance(items, list) else []
+
+
+def _batch_item(item, count):
+    """(id, alternatives) of one batch entry, or None if it is malformed"""
+    try:
+        i = int(item["id"])
+        alternatives = item["alternatives"]
+    except (ValueError, KeyError, TypeError):
+        return None
+    if (0 <= i < count and isinstance(alternatives, list) and alternatives
+            and all(isinstance(a, str) for a in alternatives)):
+        return i, alternatives
+    return None
+
+
+def _translate_one(sentence):
+    """formal_translator's answer, or an error message in its place"""
+    try:
+        return formal_translator(sentence)
+    except Exception as e:
+        return f"Translation failed: {e}"
+
+
+def translate_batch(sentences,
+                    batch_size=TRANSLATION_BATCH_SIZE,
+                    concurrency=TRANSLATION_CONCURRENCY):
+    """Translate many sentences, yielding (sentence, translation) in order
+
+    Sentences are packed `batch_size` to a request and at most `concurrency`
+    requests run at once. Each result is yielded as soon as it and every
+    sentence before it are done.
+    """
+    sentences = list(sentences)
+    chunks = [
+        sentences[start:start + batch_size]
+        for start in range(0, len(sentences), batch_size)
+    ]
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(_translate_chunk, c) for c in chunks]
+        for chunk, future in zip(chunks, futures):
+            yield from zip(chunk, future.result())
+
+
+def csv_sentences(text, column=None, header=True):
+    """Sentences in a CSV column, the first one unless `column` names it
+
+    With `header` set the first row holds column names, not a sentence.
+    Raises ValueError, listing the columns, if `column` is not one of them.
+    """
+    rows = list(csv.reader(io.StringIO(text)))
+    if not rows:
+        return []
+    index = 0
+    if header:
+        if column is not None:
+            if column not in rows[0]:
+                raise ValueError(f"No column {column!r}; the columns are: "
+                                 f"{', '.join(rows[0])}")
+            index = rows[0].index(column)
+        rows = rows[1:]
+    return [row[index].strip() for row in rows
+            if len(row) > index and row[index].strip()]
+
+
+def read_sentences(path, column=None, header=True):
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        text = f.read()
+    if not path.lower().endswith(".csv"):
+        return split_sentences(text)
+    return csv_sentences(text, column, header)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Rewrite sentences in professional language")
+    parser.add_argument("input", help="text document or CSV of sentences")
+    parser.add_argument("--column",
+                        help="CSV column with the sentences, by header name")
+    parser.add_argument("--no-header",
+                        dest="header",
+                        action="store_false",
+                        help="the CSV's first row is a sentence, not a header")
+    parser.add_argument("-b",
+                        "--batch-size",
+                        type=int,
+                        default=TRANSLATION_BATCH_SIZE,
+                        help="sentences per request")
+    parser.add_argument("-c",
+                        "--concurrency",
+                        type=int,
+                        default=TRANSLATION_CONCURRENCY,
+                        help="requests in flight at once")
+    parser.add_argument("-o",
+                        "--output",
+                        default="translations.csv",
+                        help="CSV file for the translations")
+    args = parser.parse_args(argv)
+
+    if args.column is not None and not args.header:
+        parser.error("--column needs a header row")
+    try:
+        sentences = read_sentences(args.input, args.column, args.header)
+    except ValueError as e:
+        parser.error(str(e))
+    started = time.perf_counter()
+    with open(args.output, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        for sentence, translation in translate_batch(
+                sentences, args.batch_size, args.concurrency):
+            writer.writerow({
+                "sentence": sentence,
+                "translation": translation
+            })
+    elapsed = time.perf_counter() - started
+    print(f"{len(sentences)} sentences in {elapsed:.1f}s "
+          f"({len(sentences) / max(elapsed, 1e-9):.2f} sentences/s)",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
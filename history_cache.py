@@ -0,0 +1,76 @@
+import os
+import threading
+from collections import OrderedDict
+
+# Upper bound on the memory held by cached history pages
+HISTORY_CACHE_MAX_BYTES = int(
+    os.getenv("HISTORY_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# Rough per-message overhead of the dict holding it
+MESSAGE_OVERHEAD = 200
+
+
+def message_size(message):
+    """Approximate memory held by one cached message"""
+    return MESSAGE_OVERHEAD + sum(
+        len(str(value)) for value in message.values())
+
+
+class HistoryCache:
+    """LRU cache of history pages, bounded by an estimate of their size
+
+    Keys start with the log they were read from and its version, so a write
+    from any session or process makes older entries unreachable. Writes in
+    this process also invalidate the log's entries, to free their memory.
+    """
+
+    def __init__(self, max_bytes=HISTORY_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._keys_by_log = {}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            messages, start = entry[0]
+        # Callers may append to the list they get back
+        return list(messages), start
+
+    def put(self, key, value):
+        messages, start = value
+        size = sum(message_size(m) for m in messages)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = ((list(messages), start), size)
+            self._keys_by_log.setdefault(key[0], set()).add(key)
+            self.size += size
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, log):
+        """Drop every cached page of a log"""
+        with self._lock:
+            for key in list(self._keys_by_log.get(log, ())):
+                self._remove(key)
+
+    def _remove(self, key):
+        _, size = self._entries.pop(key)
+        self.size -= size
+        keys = self._keys_by_log[key[0]]
+        keys.discard(key)
+        if not keys:
+            del self._keys_by_log[key[0]]
@@ -0,0 +1,173 @@
+"""Load test of HistoryStore with many concurrent chat sessions
+
+Usage: python history_loadtest.py [-s SESSIONS] [-t TURNS] [--tabs TABS]
+
+Each simulated session chats in a few rooms from several browser tabs at
+once, reading the newest page after every turn as the app does on a rerun.
+One room is also cleared and replaced now and then. Afterwards the store is
+reopened and every history is checked against what was written. Exits with
+status 1 if any history is wrong.
+"""
+import argparse
+import math
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from history_store import PAGE_SIZE, HistoryStore, new_session_id
+
+SHARED_ROOMS = ["Interview Preparation", "Workplace Tips"]
+REWRITTEN_ROOM = "Resume Help"
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+class Timings:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+
+    def time(self, name, fn, *args):
+        started = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.samples.setdefault(name, []).append(elapsed)
+        return result
+
+
+def run_tab(store, timings, session_id, tab, turns, seed):
+    """One browser tab: append turns, reading the page after each one"""
+    rng = random.Random(seed)
+    errors = []
+    expected = []
+    for turn in range(turns):
+        room = SHARED_ROOMS[turn % len(SHARED_ROOMS)]
+        for role in ("user", "assistant"):
+            timings.time("append", store.append, session_id, room, {
+                "role": role,
+                "content": f"{tab}:{turn}:{role}"
+            })
+        messages, start = timings.time("load_page", store.load_page,
+                                       session_id, room)
+        if start < 0 or any(set(m) != {"role", "content"} for m in messages):
+            errors.append(f"{session_id} {room}: malformed page")
+
+        # The first tab also rewrites a room of its own
+        if tab == 0:
+            action = rng.random()
+            if action < 0.1:
+                timings.time("clear", store.clear, session_id,
+                             REWRITTEN_ROOM)
+                expected = []
+            elif action < 0.2:
+                expected = [{"role": "user", "content": f"imported {turn}"}]
+                timings.time("replace", store.replace, session_id,
+                             REWRITTEN_ROOM, expected)
+            else:
+                message = {"role": "user", "content": f"note {turn}"}
+                timings.time("append", store.append, session_id,
+                             REWRITTEN_ROOM, message)
+                expected = expected + [message]
+            page, _ = timings.time("load_page", store.load_page, session_id,
+                                   REWRITTEN_ROOM)
+            if page != expected[-PAGE_SIZE:]:
+                errors.append(f"{session_id} {REWRITTEN_ROOM}: stale page")
+    return errors, expected
+
+
+def check_shared_room(history, tabs, turns, room_index):
+    """Every tab's messages present once each, in the order written"""
+    by_tab = {}
+    for message in history:
+        tab, turn, role = message["content"].split(":")
+        by_tab.setdefault(int(tab), []).append((int(turn), role))
+    for tab in range(tabs):
+        written = [(turn, role) for turn in range(turns)
+                   if turn % len(SHARED_ROOMS) == room_index
+                   for role in ("user", "assistant")]
+        if by_tab.get(tab, []) != written:
+            return False
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Load test the chat history store")
+    parser.add_argument("-s", "--sessions", type=int, default=100)
+    parser.add_argument("-t",
+                        "--turns",
+                        type=int,
+                        default=50,
+                        help="turns per tab")
+    parser.add_argument("--tabs",
+                        type=int,
+                        default=2,
+                        help="tabs writing to each session at once")
+    parser.add_argument("--root",
+                        help="store directory (default: a temporary one)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    root = args.root or tempfile.mkdtemp(prefix="history_loadtest_")
+    store = HistoryStore(root)
+    timings = Timings()
+    sessions = [new_session_id() for _ in range(args.sessions)]
+    errors = []
+    expected = {}
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.sessions * args.tabs) as pool:
+        futures = {(session_id, tab): pool.submit(
+            run_tab, store, timings, session_id, tab, args.turns,
+            f"{args.seed}:{session_id}")
+                   for session_id in sessions for tab in range(args.tabs)}
+        for (session_id, tab), future in futures.items():
+            tab_errors, rewritten = future.result()
+            errors.extend(tab_errors)
+            if tab == 0:
+                expected[session_id] = rewritten
+    elapsed = time.perf_counter() - started
+    store.close()
+
+    # Everything written must be there after a restart
+    store = HistoryStore(root)
+    for session_id in sessions:
+        for i, room in enumerate(SHARED_ROOMS):
+            if not check_shared_room(store.load(session_id, room), args.tabs,
+                                     args.turns, i):
+                errors.append(f"{session_id} {room}: lost or reordered")
+        if store.load(session_id, REWRITTEN_ROOM) != expected[session_id]:
+            errors.append(f"{session_id} {REWRITTEN_ROOM}: wrong history")
+    store.close()
+    if not args.root:
+        shutil.rmtree(root, ignore_errors=True)
+
+    operations = sum(len(v) for v in timings.samples.values())
+    print(f"{args.sessions} sessions x {args.tabs} tabs, "
+          f"{operations} operations in {elapsed:.2f}s "
+          f"({operations / elapsed:.0f} ops/s)")
+    for name, samples in sorted(timings.samples.items()):
+        print(f"  {name:10} n={len(samples):6d}  "
+              f"p50={percentile(samples, 50) * 1000:7.2f}ms  "
+              f"p95={percentile(samples, 95) * 1000:7.2f}ms  "
+              f"p99={percentile(samples, 99) * 1000:7.2f}ms")
+    for error in errors[:20]:
+        print(error, file=sys.stderr)
+    if errors:
+        print(f"{len(errors)} errors", file=sys.stderr)
+        return 1
+    print("all histories intact")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,465 @@
+import json
+import os
+import queue
+import struct
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from history_cache import HistoryCache
+
+# Directory holding one append-only log per (session, room)
+HISTORY_DIR = os.getenv("HISTORY_DIR", "chat_history")
+
+# fsync a log after this many appends, or after this many seconds
+FSYNC_BATCH_SIZE = int(os.getenv("HISTORY_FSYNC_BATCH_SIZE", "32"))
+FSYNC_INTERVAL = float(os.getenv("HISTORY_FSYNC_INTERVAL", "1.0"))
+
+# Idle append handles are closed beyond this many open logs
+MAX_OPEN_LOGS = int(os.getenv("HISTORY_MAX_OPEN_LOGS", "256"))
+
+# Number of most recent messages loaded when a room is first opened
+PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "50"))
+
+# Index entries are unsigned 64-bit byte offsets into the log
+OFFSET_FORMAT = ">Q"
+OFFSET_SIZE = struct.calcsize(OFFSET_FORMAT)
+
+# Marker record written when a history is cleared or replaced
+CLEAR_RECORD = {"op": "clear"}
+
+
+def new_session_id():
+    """Create an id for a new chat session"""
+    return uuid.uuid4().hex
+
+
+def room_slug(room):
+    """File-safe name for a room, e.g. "Workplace Tips" -> "workplace_tips" """
+    return room.lower().replace(' ', '_')
+
+
+def _decode(line):
+    """The record on a log line, or None if the line is corrupt"""
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    return record if isinstance(record, dict) else None
+
+
+def read_log(path):
+    """Replay a log file into the list of live messages"""
+    history = []
+    if not os.path.exists(path):
+        return history
+    with open(path, "rb") as f:
+        for line in f:
+            record = _decode(line)
+            if record is None:
+                # A crash mid-append can leave a torn last line
+                continue
+            if record.get("op") == "clear":
+                history = []
+            else:
+                history.append(record)
+    return history
+
+
+def build_index(path):
+    """Byte offsets of the live records in a log file"""
+    offsets = []
+    if not os.path.exists(path):
+        return offsets
+    with open(path, "rb") as f:
+        offset = 0
+        for line in f:
+            start, offset = offset, offset + len(line)
+            record = _decode(line) if line.endswith(b"\n") else None
+            if record is None:
+                # Torn or corrupt lines are never indexed
+                continue
+            if record.get("op") == "clear":
+                offsets = []
+            else:
+                offsets.append(start)
+    return offsets
+
+
+def truncate_torn_tail(path, block_size=65536):
+    """Cut a log back to its last complete line
+
+    A crash mid-append can leave a partial last line; appending after it
+    would glue the next record onto those bytes.
+    """
+    with open(path, "r+b") as f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            start = max(0, position - block_size)
+            f.seek(start)
+            newline = f.read(position - start).rfind(b"\n")
+            if newline >= 0:
+                position = start + newline + 1
+                break
+            position = start
+        if position < end:
+            f.truncate(position)
+
+
+class _Log:
+    """Append handles for a single history log and its offset index
+
+    The index is a sidecar file of fixed-width offsets, one per live record,
+    so any page of the history can be read without scanning the log.
+
+    Writers go through a queue: whoever holds the lock writes everything
+    queued so far in one go, so concurrent appends share a write and flush.
+    Readers take no lock. `generation` is odd while the index is being
+    truncated or rewritten, and changes with every such rewrite, so a read
+    that overlapped one can tell and retry.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.index_path = path + ".idx"
+        self.lock = threading.Lock()
+        self.queue = []
+        self.queue_lock = threading.Lock()
+        self.generation = 0
+        if os.path.exists(path):
+            truncate_torn_tail(path)
+        self.file = open(path, "ab")
+        if not self._index_valid():
+            _write_index(self.index_path, build_index(path))
+        self.index = open(self.index_path, "ab")
+        self.unsynced = 0
+        self.closed = False
+
+    def submit(self, records):
+        """Queue records and write the queue; False if the log was closed"""
+        entry = {"records": records, "written": False, "error": None}
+        with self.queue_lock:
+            if self.closed:
+                return False
+            self.queue.append(entry)
+        with self.lock:
+            if not entry["written"]:
+                self._drain()
+        if entry["error"] is not None:
+            raise entry["error"]
+        return True
+
+    def _drain(self):
+        """Write every queued entry; called with the lock held"""
+        with self.queue_lock:
+            batch, self.queue = self.queue, []
+        if not batch:
+            return
+        try:
+            self.write([record for e in batch for record in e["records"]])
+            if self.unsynced >= FSYNC_BATCH_SIZE:
+                self.sync()
+        except Exception as e:
+            for entry in batch:
+                entry["error"] = e
+        for entry in batch:
+            entry["written"] = True
+
+    def _index_valid(self):
+        size = os.path.getsize(self.path)
+        if not os.path.exists(self.index_path):
+            return size == 0
+        index_size = os.path.getsize(self.index_path)
+        if index_size % OFFSET_SIZE:
+            return False
+        if index_size == 0:
+            return size == 0
+        with open(self.index_path, "rb") as f:
+            f.seek(index_size - OFFSET_SIZE)
+            last = struct.unpack(OFFSET_FORMAT, f.read(OFFSET_SIZE))[0]
+        # The last indexed record must be the last line of the log
+        with open(self.path, "rb") as f:
+            f.seek(last)
+            tail = f.read()
+        return tail.count(b"\n") == 1 and tail.endswith(b"\n")
+
+    def write(self, records):
+        offsets = []
+        truncated = False
+        for record in records:
+            if record is CLEAR_RECORD:
+                if not truncated:
+                    self.generation += 1
+                    truncated = True
+                self.index.truncate(0)
+                offsets = []
+            else:
+                offsets.append(self.file.tell())
+            self.file.write(json.dumps(record).encode("utf-8") + b"\n")
+        try:
+            self.file.flush()
+            # Index after the data, so indexed offsets always point at whole
+            # lines
+            self.index.write(b"".join(
+                struct.pack(OFFSET_FORMAT, offset) for offset in offsets))
+            self.index.flush()
+        finally:
+            if truncated:
+                self.generation += 1
+        self.unsynced += len(records)
+
+    def sync(self):
+        if self.unsynced and not self.file.closed:
+            os.fsync(self.file.fileno())
+            os.fsync(self.index.fileno())
+            self.unsynced = 0
+
+    def close(self):
+        """Close the log, first writing whatever is still queued"""
+        if not self.closed:
+            with self.queue_lock:
+                self.closed = True
+            self._drain()
+            self.sync()
+            self.file.close()
+            self.index.close()
+
+
+def _write_index(index_path, offsets):
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(b"".join(struct.pack(OFFSET_FORMAT, o) for o in offsets))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, index_path)
+
+
+def read_page(path, start, end):
+    """Read live records [start, end) of a log through its index"""
+    if end <= start:
+        return []
+    with open(path + ".idx", "rb") as f:
+        f.seek(start * OFFSET_SIZE)
+        data = f.read((end - start) * OFFSET_SIZE)
+    records = []
+    with open(path, "rb") as f:
+        for (offset, ) in struct.iter_unpack(OFFSET_FORMAT, data):
+            if f.tell() != offset:
+                f.seek(offset)
+            record = _decode(f.readline())
+            if record is not None:
+                records.append(record)
+    return records
+
+
+class HistoryStore:
+    """Chat histories kept as append-only JSONL logs keyed by session and room
+
+    Each message is one appended line, so the cost of saving a turn does not
+    grow with the length of the history. Logs are fsynced in batches by a
+    background worker, which also compacts logs after a clear or replace.
+    Writes to a log are serialized through its queue; reads never wait for
+    them.
+    """
+
+    def __init__(self, root=HISTORY_DIR, cache=None):
+        self.root = root
+        self.cache = cache if cache is not None else HistoryCache()
+        self._lock = threading.Lock()
+        self._logs = OrderedDict()
+        self._tasks = queue.Queue()
+        self._stopped = threading.Event()
+        self._worker = threading.Thread(target=self._run,
+                                        name="history-store",
+                                        daemon=True)
+        self._worker.start()
+
+    def path(self, session_id, room):
+        if not session_id.isalnum():
+            raise ValueError(f"Invalid session id: {session_id!r}")
+        return os.path.join(self.root, session_id, room_slug(room) + ".jsonl")
+
+    def load(self, session_id, room):
+        """Return the full live history of a room for a session"""
+        return read_log(self.path(session_id, room))
+
+    def count(self, session_id, room):
+        """Number of live messages in a room's history"""
+        path = self.path(session_id, room)
+        return self._read(path, lambda: self._count(path))
+
+    def load_page(self, session_id, room, before=None, limit=PAGE_SIZE):
+        """Return up to `limit` messages preceding position `before`
+
+        With `before` unset the newest messages are returned. The result is
+        (messages, start), where `start` is the position of the first message
+        and can be passed as `before` to fetch the page above it.
+        """
+        path = self.path(session_id, room)
+        key = (path, self._version(path), before, limit)
+        page = self.cache.get(key)
+        if page is not None:
+            return page
+
+        def read():
+            end = self._count(path)
+            if before is not None:
+                end = min(before, end)
+            start = max(0, end - limit)
+            return read_page(path, start, end), start
+
+        messages, start = self._read(path, read)
+        self.cache.put(key, (messages, start))
+        return list(messages), start
+
+    def append(self, session_id, room, message):
+        """Append a single message to a room's history"""
+        self._write(session_id, room, [message])
+
+    def clear(self, session_id, room):
+        """Drop a room's history; the log is compacted in the background"""
+        self._write(session_id, room, [CLEAR_RECORD], compact=True)
+
+    def replace(self, session_id, room, history):
+        """Replace a room's history, e.g. with an imported transcript"""
+        self._write(session_id, room, [CLEAR_RECORD, *history], compact=True)
+
+    def flush(self):
+        """fsync every log with pending writes"""
+        with self._lock:
+            logs = list(self._logs.values())
+        for log in logs:
+            with log.lock:
+                log.sync()
+
+    def close(self):
+        self._stopped.set()
+        self._tasks.put(None)
+        self._worker.join()
+        with self._lock:
+            logs = list(self._logs.values())
+            self._logs.clear()
+        for log in logs:
+            with log.lock:
+                log.close()
+
+    def _version(self, path):
+        """Changes whenever the log is appended to or compacted"""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _count(self, path):
+        try:
+            return os.path.getsize(path + ".idx") // OFFSET_SIZE
+        except FileNotFoundError:
+            return 0
+
+    def _read(self, path, read):
+        """Run read() without locking, retrying if the index was rewritten
+
+        Appends are safe to read through, as the index only ever points at
+        complete lines. A clear or compaction can swap the files mid-read,
+        which the log's generation reveals.
+        """
+        if not os.path.exists(path):
+            return read()
+        while True:
+            # Opening the log checks and, if needed, rebuilds its index
+            log = self._open(path)
+            generation = log.generation
+            if generation % 2:
+                time.sleep(0)
+                continue
+            try:
+                result = read()
+            except (OSError, ValueError, struct.error):
+                if log.generation == generation and not log.closed:
+                    raise
+                continue
+            if log.generation == generation and not log.closed:
+                return result
+
+    def _write(self, session_id, room, records, compact=False):
+        path = self.path(session_id, room)
+        # A log evicted between lookup and submit is opened again
+        while not self._open(path).submit(records):
+            pass
+        self.cache.invalidate(path)
+        if compact:
+            self._tasks.put(path)
+
+    def _open(self, path):
+        with self._lock:
+            log = self._logs.get(path)
+            if log is not None:
+                self._logs.move_to_end(path)
+                return log
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            log = self._logs[path] = _Log(path)
+            # Closed before the lock is released, so the same path is never
+            # reopened while its old handles may still be writing. Nothing
+            # takes this lock while holding a log's, so the order is safe
+            while len(self._logs) > MAX_OPEN_LOGS:
+                old = self._logs.popitem(last=False)[1]
+                with old.lock:
+                    old.close()
+        return log
+
+    def _compact(self, path):
+        """Rewrite a log with only its live records"""
+        with self._lock:
+            log = self._logs.get(path)
+        if log is None:
+            return
+        with log.lock:
+            if log.closed:
+                return
+            log._drain()
+            log.generation += 1
+            try:
+                self._rewrite(log, path)
+            finally:
+                log.generation += 1
+        self.cache.invalidate(path)
+
+    def _rewrite(self, log, path):
+        """Replace the log and its index with only the live records"""
+        history = read_log(path)
+        offsets = []
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            for record in history:
+                offsets.append(f.tell())
+                f.write(json.dumps(record).encode("utf-8") + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+        log.file.close()
+        log.index.close()
+        os.replace(tmp_path, path)
+        _write_index(log.index_path, offsets)
+        log.file = open(path, "ab")
+        log.index = open(log.index_path, "ab")
+        log.unsynced = 0
+
+    def _run(self):
+        next_sync = time.monotonic() + FSYNC_INTERVAL
+        while not self._stopped.is_set():
+            try:
+                path = self._tasks.get(
+                    timeout=max(0, next_sync - time.monotonic()))
+            except queue.Empty:
+                path = None
+            if path is not None:
+                try:
+                    self._compact(path)
+                except OSError:
+                    # Compaction is best effort, the log stays readable
+                    pass
+            if time.monotonic() >= next_sync:
+                self.flush()
+                next_sync = time.monotonic() + FSYNC_INTERVAL
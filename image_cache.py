@@ -0,0 +1,37 @@
+import hashlib
+import os
+
+# Generated images, named by the SHA-256 of their prompt
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", "image_cache")
+IMAGE_CACHE_MAX_FILES = int(os.getenv("IMAGE_CACHE_MAX_FILES", "500"))
+
+
+def cached_image(prompt, generate, suffix=".png"):
+    """Path of the image for a prompt, calling generate(prompt) on a miss
+
+    `generate` returns the image bytes. Least recently used images beyond
+    IMAGE_CACHE_MAX_FILES are removed.
+    """
+    key = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    path = os.path.join(IMAGE_CACHE_DIR, key + suffix)
+    if os.path.exists(path):
+        os.utime(path)
+        return path
+
+    data = generate(prompt)
+    os.makedirs(IMAGE_CACHE_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+    entries = sorted(
+        (entry.stat().st_mtime, entry.path)
+        for entry in os.scandir(IMAGE_CACHE_DIR)
+        if entry.name.endswith(suffix))
+    for _, old_path in entries[:-IMAGE_CACHE_MAX_FILES]:
+        try:
+            os.remove(old_path)
+        except FileNotFoundError:
+            pass
+    return path
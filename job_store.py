@@ -0,0 +1,257 @@
+"""Job descriptions and their extracted requirements, kept across restarts
+
+A description is split into sections at blank lines, and the requirements
+of each section are stored under the section's hash, so an edited posting,
+or a near-identical copy of one, only sends its changed sections to the
+LLM. Its unchanged sections are reused as they are.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import llm_metrics
+from background import submit
+from prompts import JOB_REQUIREMENTS, JOB_SECTION_REQUIREMENTS
+
+# Directory of the postings log and of one file per extracted section
+JOB_STORE_DIR = os.getenv("JOB_STORE_DIR", "job_store")
+JOB_STORE_MAX_POSTINGS = int(os.getenv("JOB_STORE_MAX_POSTINGS", "5000"))
+JOB_STORE_MAX_SECTIONS = int(os.getenv("JOB_STORE_MAX_SECTIONS", "20000"))
+
+# Paragraphs are merged into sections of at least this many words
+SECTION_MIN_WORDS = 40
+
+NO_REQUIREMENTS = "none"
+
+
+def normalize(text):
+    """Collapse whitespace, the form descriptions are hashed in"""
+    return " ".join(text.split())
+
+
+def description_key(job_description):
+    """Hash of a job description, ignoring differences in whitespace"""
+    return hashlib.sha256(
+        normalize(job_description).encode("utf-8")).hexdigest()
+
+
+def split_sections(job_description):
+    """Normalized sections of a description, split at blank lines
+
+    Short paragraphs are merged with the ones after them, so a list of
+    one-line bullets does not become one LLM call per bullet.
+    """
+    sections = []
+    current = []
+    for paragraph in re.split(r"\n\s*\n", job_description):
+        paragraph = normalize(paragraph)
+        if not paragraph:
+            continue
+        current.append(paragraph)
+        if sum(len(p.split()) for p in current) >= SECTION_MIN_WORDS:
+            sections.append("\n".join(current))
+            current = []
+    if current:
+        sections.append("\n".join(current))
+    return sections
+
+
+def section_key(prompt, section):
+    payload = prompt.version + "\0" + section
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class JobStore:
+    """Postings and per-section requirements under one directory
+
+    Postings are kept in memory and appended to postings.jsonl; section
+    requirements are one small file each, named by the hash of the prompt
+    version and the section's text. Which sections were used last is kept
+    in memory too, so the least recently used can be evicted without
+    scanning the directory.
+    """
+
+    def __init__(self, root=JOB_STORE_DIR):
+        self.root = root
+        self.sections_dir = os.path.join(root, "sections")
+        self.log_path = os.path.join(root, "postings.jsonl")
+        self._lock = threading.Lock()
+        self._postings = OrderedDict()
+        # Stored section keys, least recently used first
+        self._sections = OrderedDict()
+        self._load()
+
+    def requirements(self, job_description, ask):
+        """Requirements of a job description, with as few LLM calls as possible
+
+        `ask(messages)` returns the LLM's reply; errors it raises are raised
+        from here too. Returns None if `ask` returned None for any section.
+        """
+        key = description_key(job_description)
+        with self._lock:
+            posting = self._postings.get(key)
+        if posting is not None:
+            requirements = self._combine(posting["sections"])
+            if requirements is not None:
+                llm_metrics.record_cache_hit()
+                return requirements
+
+        sections = split_sections(job_description)
+        if len(sections) <= 1:
+            # A short description is analyzed whole, and may need general
+            # requirements made up for it
+            prompt = JOB_REQUIREMENTS
+            sections = [normalize(job_description)]
+        else:
+            prompt = JOB_SECTION_REQUIREMENTS
+        keys = [section_key(prompt, section) for section in sections]
+        # Only sections whose exact text was analyzed before are reused
+        stored = {k: self._read_section(k) for k in keys}
+        missing = [(k, s) for k, s in zip(keys, sections)
+                   if stored[k] is None]
+        if missing:
+            # The first section is analyzed on this thread, the rest alongside
+            futures = [
+                submit(ask, prompt.messages(f"Job Description:\n{s}"))
+                for _, s in missing[1:]
+            ]
+            replies = [
+                ask(prompt.messages(f"Job Description:\n{missing[0][1]}"))
+            ]
+            replies += [future.result() for future in futures]
+            if any(reply is None for reply in replies):
+                return None
+            for (k, _), reply in zip(missing, replies):
+                stored[k] = reply
+                self._write_section(k, reply)
+        else:
+            llm_metrics.record_cache_hit()
+
+        self._add({"key": key, "sections": keys})
+        return self._combine(keys, stored)
+
+    def _combine(self, section_keys, stored=None):
+        """Requirements of a posting from its sections, None if any is gone"""
+        parts = []
+        for key in section_keys:
+            text = (stored or {}).get(key) or self._read_section(key)
+            if text is None:
+                return None
+            if text.strip().strip(".").lower() != NO_REQUIREMENTS:
+                parts.append(text.strip())
+        return "\n".join(parts)
+
+    def _add(self, posting, persist=True):
+        with self._lock:
+            self._postings.pop(posting["key"], None)
+            self._postings[posting["key"]] = posting
+            while len(self._postings) > JOB_STORE_MAX_POSTINGS:
+                self._postings.popitem(last=False)
+            if persist:
+                try:
+                    os.makedirs(self.root, exist_ok=True)
+                    with open(self.log_path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(posting) + "\n")
+                except OSError:
+                    # The store is best effort, requirements are still returned
+                    pass
+
+    def _load(self):
+        try:
+            # Sections by when they were last used, as of the previous run
+            entries = sorted(
+                (entry.stat().st_mtime, entry.name[:-len(".txt")])
+                for entry in os.scandir(self.sections_dir)
+                if entry.name.endswith(".txt"))
+        except FileNotFoundError:
+            entries = []
+        self._sections.update((key, None) for _, key in entries)
+
+        try:
+            with open(self.log_path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return
+        for line in lines:
+            try:
+                posting = json.loads(line)
+                self._add({"key": posting["key"],
+                           "sections": posting["sections"]},
+                          persist=False)
+            except (ValueError, KeyError, TypeError):
+                # A crash mid-append can leave a torn last line
+                continue
+        if len(lines) > 2 * JOB_STORE_MAX_POSTINGS:
+            self._rewrite()
+
+    def _rewrite(self):
+        """Replace the log with only the postings kept in memory"""
+        tmp_path = f"{self.log_path}.{os.getpid()}.tmp"
+        with self._lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for posting in self._postings.values():
+                    f.write(json.dumps(posting) + "\n")
+            os.replace(tmp_path, self.log_path)
+
+    def _read_section(self, key):
+        path = os.path.join(self.sections_dir, key + ".txt")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+            # Touch the file so the next run still sees it as recently used
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._sections.pop(key, None)
+            return None
+        self._used(key)
+        return text
+
+    def _write_section(self, key, text):
+        try:
+            os.makedirs(self.sections_dir, exist_ok=True)
+            path = os.path.join(self.sections_dir, key + ".txt")
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        except OSError:
+            return
+        self._used(key)
+
+    def _used(self, key):
+        """Mark a section as just used, evicting the least recently used"""
+        with self._lock:
+            self._sections[key] = None
+            self._sections.move_to_end(key)
+            evicted = []
+            while len(self._sections) > JOB_STORE_MAX_SECTIONS:
+                evicted.append(self._sections.popitem(last=False)[0])
+        for old_key in evicted:
+            try:
+                os.remove(os.path.join(self.sections_dir, old_key + ".txt"))
+            except FileNotFoundError:
+                pass
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Process-wide store under JOB_STORE_DIR, opened on first use"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = JobStore()
+    return _store
+
+
+def set_store(store):
+    """Use another store, e.g. a temporary one; None reopens the default"""
+    global _store
+    with _store_lock:
+        _store = store
@@ -0,0 +1,189 @@
+import os
+import random
+import threading
+import time
+
+import httpx
+import openai
+from openai import OpenAI
+
+import llm_metrics
+
+# Request timeouts in seconds
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+
+# Retries on rate limits (429), server errors (5xx) and connection failures
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "20"))
+
+# Connection pool size, and cap on requests in flight across the process
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+
+# "openai", or "fake" for the local stand-in in fake_llm.py
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")
+
+_clients = {}
+_clients_lock = threading.Lock()
+_backend = None
+_slots = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+
+
+def set_backend(factory):
+    """Make clients with factory(api_key) instead of the OpenAI SDK
+
+    The factory's clients need the parts of the OpenAI client used here:
+    chat.completions.create, embeddings.create and images.generate. Pass
+    None to go back to LLM_BACKEND.
+    """
+    global _backend
+    with _clients_lock:
+        _backend = factory
+        _clients.clear()
+
+
+def _new_client(api_key):
+    if _backend is not None:
+        return _backend(api_key)
+    if LLM_BACKEND == "fake":
+        from fake_llm import FakeClient
+        return FakeClient.from_env()
+    return OpenAI(
+        api_key=api_key,
+        timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+        # Retries are handled below, with jitter and a request cap
+        max_retries=0,
+        http_client=openai.DefaultHttpxClient(limits=httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_CONNECTIONS)))
+
+
+def get_client(api_key=None):
+    """Shared OpenAI client, created once per process and API key
+
+    Streamlit re-executes app scripts on every interaction, but imported
+    modules persist, so keeping the client here reuses its connections.
+    """
+    api_key = api_key or os.getenv("OPENAI_API_KEY")
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = _clients[api_key] = _new_client(api_key)
+    return client
+
+
+def is_retryable(error):
+    if isinstance(error, openai.APIConnectionError):
+        # Includes timeouts
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+def backoff_delay(attempt, error=None):
+    """Full-jitter exponential backoff, honouring Retry-After when sent"""
+    response = getattr(error, "response", None)
+    if response is not None:
+        try:
+            return min(float(response.headers["retry-after"]),
+                       LLM_BACKOFF_MAX)
+        except (KeyError, ValueError):
+            pass
+    return random.uniform(0, min(LLM_BACKOFF_MAX,
+                                 LLM_BACKOFF_BASE * 2**attempt))
+
+
+def _acquire_with_retries(request, kwargs):
+    """Make a request under a concurrency slot, returning with it held"""
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        _slots.acquire()
+        try:
+            return request(**kwargs)
+        except Exception as e:
+            _slots.release()
+            if attempt == LLM_MAX_RETRIES or not is_retryable(e):
+                raise
+            time.sleep(backoff_delay(attempt, e))
+
+
+def call_with_retries(request, **kwargs):
+    """Run an API request under the concurrency cap, retrying on failure
+
+    The call, including time spent waiting for a slot and retrying, is
+    recorded in llm_metrics.
+    """
+    started = time.perf_counter()
+    try:
+        result = _acquire_with_retries(request, kwargs)
+    except Exception:
+        llm_metrics.record(kwargs.get("model"),
+                           latency=time.perf_counter() - started,
+                           status="error")
+        raise
+    _slots.release()
+    llm_metrics.record(kwargs.get("model"), getattr(result, "usage", None),
+                       time.perf_counter() - started)
+    return result
+
+
+def chat_completion(api_key=None, **kwargs):
+    """client.chat.completions.create through the shared client"""
+    return call_with_retries(get_client(api_key).chat.completions.create,
+                             **kwargs)
+
+
+def chat_completion_stream(api_key=None, **kwargs):
+    """Yield the text of a chat completion as it is generated
+
+    The request keeps its concurrency slot until the stream is exhausted or
+    closed. Only opening the stream is retried. The caller's llm_metrics
+    labels are taken now, as the stream may be read elsewhere.
+    """
+    return _stream(api_key, kwargs, llm_metrics.current_labels())
+
+
+def _stream(api_key, kwargs, labels):
+    started = time.perf_counter()
+    usage = None
+    status = "error"
+    try:
+        stream = _acquire_with_retries(
+            get_client(api_key).chat.completions.create,
+            dict(kwargs, stream=True, stream_options={"include_usage": True}))
+    except Exception:
+        llm_metrics.record(kwargs.get("model"),
+                           latency=time.perf_counter() - started,
+                           status=status,
+                           labels=labels)
+        raise
+    try:
+        for chunk in stream:
+            if getattr(chunk, "usage", None) is not None:
+                usage = chunk.usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+        status = "ok"
+    except GeneratorExit:
+        status = "cancelled"
+        raise
+    finally:
+        stream.close()
+        _slots.release()
+        llm_metrics.record(kwargs.get("model"),
+                           usage,
+                           time.perf_counter() - started,
+                           status=status,
+                           labels=labels)
+
+
+def create_embedding(api_key=None, **kwargs):
+    """client.embeddings.create through the shared client"""
+    return call_with_retries(get_client(api_key).embeddings.create, **kwargs)
+
+
+def generate_image(api_key=None, **kwargs):
+    """client.images.generate through the shared client"""
+    return call_with_retries(get_client(api_key).images.generate, **kwargs)
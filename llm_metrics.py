@@ -0,0 +1,269 @@
+"""Token, cost and latency accounting for every LLM call
+
+llm_client records each request here, labelled with the room and function
+set by the caller through `labels` or `instrumented`. Totals are kept as
+in-process counters and a latency histogram per label set. They can be read
+with snapshot(), rendered as Prometheus text, or streamed call by call to a
+JSONL file.
+"""
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Append one JSON line per call to this file, when set
+LLM_METRICS_JSONL = os.getenv("LLM_METRICS_JSONL")
+
+# Rewrite this file with the Prometheus text format, when set, at most every
+# LLM_METRICS_TEXTFILE_INTERVAL seconds (for node_exporter's textfile
+# collector, since Streamlit cannot serve a /metrics endpoint)
+LLM_METRICS_TEXTFILE = os.getenv("LLM_METRICS_TEXTFILE")
+LLM_METRICS_TEXTFILE_INTERVAL = float(
+    os.getenv("LLM_METRICS_TEXTFILE_INTERVAL", "15"))
+
+# USD per million (prompt, completion) tokens
+PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "gpt-3.5-turbo-instruct": (1.50, 2.00),
+    "text-embedding-3-small": (0.02, 0.0),
+    "text-embedding-3-large": (0.13, 0.0),
+}
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, float("inf"))
+
+LABEL_NAMES = ("room", "function", "model", "cache", "status")
+
+_labels = contextvars.ContextVar("llm_metrics_labels", default={})
+_lock = threading.Lock()
+_jsonl_lock = threading.Lock()
+_series = {}
+_textfile_written = 0.0
+
+
+@contextmanager
+def labels(**values):
+    """Label the LLM calls made inside the block, e.g. room="Resume Help"
+
+    Labels nest, inner values winning, and follow tasks handed to
+    background.submit.
+    """
+    token = _labels.set({**_labels.get(), **values})
+    try:
+        yield
+    finally:
+        _labels.reset(token)
+
+
+def current_labels():
+    return _labels.get()
+
+
+def instrumented(room=None, function=None):
+    """Decorator labelling a function's LLM calls with its name (and room)"""
+
+    def decorate(fn):
+        values = {"function": function or fn.__name__}
+        if room is not None:
+            values["room"] = room
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with labels(**values):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def cost(model, prompt_tokens, completion_tokens):
+    """Price of a call in USD, 0 for models without a known price"""
+    for name in sorted(PRICES, key=len, reverse=True):
+        if model and model.startswith(name):
+            prompt_price, completion_price = PRICES[name]
+            return (prompt_tokens * prompt_price +
+                    completion_tokens * completion_price) / 1e6
+    return 0.0
+
+
+def _new_series():
+    return {
+        "calls": 0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "cached_prompt_tokens": 0,
+        "cost_usd": 0.0,
+        "latency_sum": 0.0,
+        "latency_buckets": [0] * len(LATENCY_BUCKETS),
+    }
+
+
+def record(model,
+           usage=None,
+           latency=0.0,
+           status="ok",
+           labels=None,
+           cost_usd=None,
+           **extra):
+    """Account for one call
+
+    `usage` is the response's usage object (or None), `labels` defaults to
+    the caller's current labels and `extra` overrides single labels. The
+    cost is worked out from PRICES unless `cost_usd` is given.
+    """
+    values = {**(current_labels() if labels is None else labels), **extra}
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = getattr(details, "cached_tokens", 0) or 0
+    call_cost = (cost(model, prompt_tokens, completion_tokens)
+                 if cost_usd is None else cost_usd)
+    key = (values.get("room", ""), values.get("function", ""), model or "",
+           values.get("cache", "none"), status)
+
+    with _lock:
+        series = _series.get(key)
+        if series is None:
+            series = _series[key] = _new_series()
+        series["calls"] += 1
+        series["prompt_tokens"] += prompt_tokens
+        series["completion_tokens"] += completion_tokens
+        series["cached_prompt_tokens"] += cached_tokens
+        series["cost_usd"] += call_cost
+        series["latency_sum"] += latency
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                series["latency_buckets"][i] += 1
+                break
+
+    if LLM_METRICS_JSONL:
+        _write_jsonl(
+            dict(zip(LABEL_NAMES, key),
+                 time=time.time(),
+                 prompt_tokens=prompt_tokens,
+                 completion_tokens=completion_tokens,
+                 cached_prompt_tokens=cached_tokens,
+                 cost_usd=call_cost,
+                 latency=latency))
+    if LLM_METRICS_TEXTFILE:
+        _maybe_write_textfile()
+
+
+def record_cache_hit(**extra):
+    """Account for a request answered from a cache, without an LLM call
+
+    Requests settled by local logic instead are recorded with
+    cache="local".
+    """
+    record(None, cache="hit", **extra)
+
+
+def snapshot():
+    """One dict per label set, with its counters and latency histogram"""
+    with _lock:
+        return [
+            dict(zip(LABEL_NAMES, key),
+                 **dict(series,
+                        latency_buckets=list(series["latency_buckets"])))
+            for key, series in _series.items()
+        ]
+
+
+def totals(by=("room", )):
+    """Counters summed over the series that share the `by` labels"""
+    groups = {}
+    for row in snapshot():
+        key = tuple(row[name] for name in by)
+        group = groups.setdefault(
+            key,
+            dict(zip(by, key),
+                 calls=0,
+                 answered_locally=0,
+                 prompt_tokens=0,
+                 completion_tokens=0,
+                 cost_usd=0.0,
+                 latency_sum=0.0))
+        for field in ("calls", "prompt_tokens", "completion_tokens",
+                      "cost_usd", "latency_sum"):
+            group[field] += row[field]
+        if row["cache"] in ("hit", "local"):
+            group["answered_locally"] += row["calls"]
+    return list(groups.values())
+
+
+def reset():
+    with _lock:
+        _series.clear()
+
+
+def prometheus_text():
+    """All series in the Prometheus text exposition format"""
+
+    def label_text(row, **more):
+        pairs = [(name, row[name]) for name in LABEL_NAMES]
+        pairs.extend(more.items())
+        return "{" + ",".join(f'{name}="{_escape(value)}"'
+                              for name, value in pairs) + "}"
+
+    rows = snapshot()
+    lines = []
+    for name, field, kind in (
+        ("llm_calls_total", "calls", "counter"),
+        ("llm_prompt_tokens_total", "prompt_tokens", "counter"),
+        ("llm_completion_tokens_total", "completion_tokens", "counter"),
+        ("llm_cached_prompt_tokens_total", "cached_prompt_tokens", "counter"),
+        ("llm_cost_usd_total", "cost_usd", "counter"),
+    ):
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(f"{name}{label_text(row)} {row[field]}" for row in rows)
+
+    lines.append("# TYPE llm_latency_seconds histogram")
+    for row in rows:
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, row["latency_buckets"]):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else str(bound)
+            lines.append(f"llm_latency_seconds_bucket"
+                         f"{label_text(row, le=le)} {cumulative}")
+        lines.append(
+            f"llm_latency_seconds_sum{label_text(row)} {row['latency_sum']}")
+        lines.append(
+            f"llm_latency_seconds_count{label_text(row)} {row['calls']}")
+    return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return (str(value).replace("\\", "\\\\").replace('"', '\\"').replace(
+        "\n", "\\n"))
+
+
+def _write_jsonl(entry):
+    line = json.dumps(entry) + "\n"
+    try:
+        with _jsonl_lock, open(LLM_METRICS_JSONL, "a", encoding="utf-8") as f:
+            f.write(line)
+    except OSError:
+        # Metrics never break a request
+        pass
+
+
+def _maybe_write_textfile():
+    global _textfile_written
+    now = time.monotonic()
+    with _lock:
+        if now - _textfile_written < LLM_METRICS_TEXTFILE_INTERVAL:
+            return
+        _textfile_written = now
+    tmp_path = f"{LLM_METRICS_TEXTFILE}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(prometheus_text())
+        os.replace(tmp_path, LLM_METRICS_TEXTFILE)
+    except OSError:
+        pass
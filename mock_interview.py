@@ -0,0 +1,297 @@
+"""Mock interview sessions, run on the server
+
+Each chat session has one InterviewSession, a small state machine:
+
+    idle --start--> answering --last answer--> finished
+                        |--time is up--> expired
+                        |--inappropriate answer--> stopped
+
+Its messages, state and deadline are saved on every transition, so a page
+refresh, or a restart, resumes the interview where it was. The questions
+follow rooms.INTERVIEW_PLAN and do not depend on the answer being typed,
+so the next one is generated in the background while the candidate types.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from background import submit
+from context_builder import ConversationContext
+from rooms import (check_appropriate, extreme_warning, get_interview_feedback,
+                   get_next_interview_question)
+
+# Directory of one saved interview per session
+INTERVIEW_DIR = os.getenv("INTERVIEW_DIR", "mock_interviews")
+
+# Length of an interview, and the questions asked before the feedback
+INTERVIEW_MINUTES = float(os.getenv("INTERVIEW_MINUTES", "20"))
+INTERVIEW_QUESTIONS = int(os.getenv("INTERVIEW_QUESTIONS", "4"))
+
+# Sessions kept in memory; others are loaded from disk when next used
+INTERVIEW_CACHE_SIZE = int(os.getenv("INTERVIEW_CACHE_SIZE", "1024"))
+
+IDLE, ANSWERING, FINISHED, EXPIRED, STOPPED = ("idle", "answering",
+                                               "finished", "expired",
+                                               "stopped")
+
+FEEDBACK_INTRO = "Thank you for completing the mock interview. Here's your feedback:\n\n"
+
+
+def _begin(turn, stream):
+    """Start a reply in the background; returns (chunks, cancel)"""
+    if stream:
+        chunks = turn(stream=True)
+        # Opening the stream is lazy, so fetch its first chunk now
+        first = submit(next, chunks, "")
+
+        def reply():
+            yield first.result()
+            yield from chunks
+
+        return reply(), lambda: first.add_done_callback(
+            lambda _: chunks.close())
+    future = submit(turn)
+
+    def reply():
+        yield future.result()
+
+    return reply(), future.cancel
+
+
+def _prefetched(future, turn, stream):
+    """The prefetched question, or a live one if prefetching failed"""
+    try:
+        question = future.result()
+    except Exception:
+        yield from turn(stream=stream) if stream else [turn()]
+    else:
+        yield question
+
+
+class InterviewSession:
+    """One candidate's mock interview; see the module docstring
+
+    Methods returning a reply return its chunks, which record the reply in
+    the history once they have all been consumed.
+    """
+
+    def __init__(self, path, state=None):
+        self.path = path
+        self.lock = threading.Lock()
+        state = state or {}
+        self.status = state.get("status", IDLE)
+        # Questions asked so far
+        self.questions = state.get("questions", 0)
+        # Wall-clock time the interview ends at, in seconds since the epoch
+        self.deadline = state.get("deadline")
+        self.history = state.get("history", [])
+        self.context = ConversationContext()
+        self._prefetch = None
+        self._replying = False
+
+    def remaining(self):
+        """Seconds left, by the server's clock"""
+        if self.deadline is None:
+            return 0.0
+        return max(0.0, self.deadline - time.time())
+
+    def running(self):
+        """Whether answers are accepted, expiring the interview if time is up"""
+        with self.lock:
+            if self.status == ANSWERING and not self.remaining():
+                self._set(EXPIRED)
+            return self.status == ANSWERING
+
+    def start(self, stream=False):
+        """Begin a new interview; returns the chunks of the first question"""
+        with self.lock:
+            self.history = []
+            self.questions = 0
+            self.deadline = time.time() + INTERVIEW_MINUTES * 60
+            self.context = ConversationContext()
+            self._prefetch = None
+            self._replying = True
+            self._set(ANSWERING)
+            chunks, _ = _begin(self._question_turn(), stream)
+        return self._recording(chunks)
+
+    def answer(self, text, stream=False):
+        """Record an answer; returns the chunks of the interviewer's reply
+
+        Moderation runs alongside the reply, which is thrown away for an
+        inappropriate answer. Returns None if the interview is not running
+        or is still replying to the previous answer. If moderation itself
+        fails, the answer is taken back and the error raised, so it can be
+        given again.
+        """
+        if not self.running():
+            return None
+        with self.lock:
+            if self._replying:
+                return None
+            self._replying = True
+            message = {"role": "user", "content": text}
+            self.history.append(message)
+            self._save()
+            prefetch = None
+            moderation = submit(check_appropriate, text)
+            intro = ""
+            if self.questions >= INTERVIEW_QUESTIONS:
+                intro = FEEDBACK_INTRO
+                history = list(self.history)
+                chunks, cancel = _begin(
+                    lambda **kwargs: get_interview_feedback(
+                        history, context=self.context, **kwargs), stream)
+            elif (self._prefetch is not None
+                  and self._prefetch[0] == self.questions):
+                prefetch = self._prefetch
+                chunks = _prefetched(prefetch[1], self._question_turn(),
+                                     stream)
+                cancel = prefetch[1].cancel
+            else:
+                chunks, cancel = _begin(self._question_turn(), stream)
+            self._prefetch = None
+
+        try:
+            appropriate = moderation.result()
+        except Exception:
+            # Not a verdict: the interview goes on as if the answer had not
+            # been sent, keeping a prefetched question for the retry
+            with self.lock:
+                if prefetch is not None:
+                    self._prefetch = prefetch
+                else:
+                    cancel()
+                if self.history and self.history[-1] is message:
+                    self.history.pop()
+                self._replying = False
+                self._save()
+            raise
+        if appropriate:
+            return self._recording(chunks, intro)
+
+        cancel()
+        warning = None
+        try:
+            warning = extreme_warning(text)
+        finally:
+            with self.lock:
+                self._replying = False
+                if warning is not None:
+                    self.history.append({
+                        "role": "assistant",
+                        "content": warning
+                    })
+                self._set(STOPPED)
+        return iter([warning])
+
+    def clear(self):
+        with self.lock:
+            self.history = []
+            self.questions = 0
+            self.deadline = None
+            self.context = ConversationContext()
+            self._prefetch = None
+            self._set(IDLE)
+
+    def restore(self, history):
+        """Show an imported transcript; a new interview starts afresh"""
+        with self.lock:
+            self.history = list(history)
+            self.deadline = None
+            self.context = ConversationContext()
+            self._prefetch = None
+            self._set(IDLE)
+
+    def _question_turn(self):
+        """The next question, asked with the history as it is now"""
+        number = self.questions
+        history = list(self.history)
+
+        def turn(stream=False):
+            return get_next_interview_question(number, history, stream,
+                                               self.context)
+
+        return turn
+
+    def _recording(self, chunks, intro=""):
+        text = ""
+        completed = False
+        try:
+            if intro:
+                text = intro
+                yield intro
+            for chunk in chunks:
+                text += str(chunk)
+                yield chunk
+            completed = True
+        finally:
+            with self.lock:
+                self._replying = False
+                # A reply finished after the time ran out is still kept
+                if completed and self.status != IDLE:
+                    self.history.append({"role": "assistant", "content": text})
+                    if intro:
+                        self.status = FINISHED
+                    elif self.status == ANSWERING:
+                        self.questions += 1
+                        self._prefetch_question()
+                    self._save()
+
+    def _prefetch_question(self):
+        """Generate the next question while the candidate answers this one"""
+        if self.questions < INTERVIEW_QUESTIONS:
+            self._prefetch = (self.questions,
+                              submit(self._question_turn()))
+
+    def _set(self, status):
+        self.status = status
+        self._save()
+
+    def _save(self):
+        state = {
+            "status": self.status,
+            "questions": self.questions,
+            "deadline": self.deadline,
+            "history": self.history
+        }
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            # Saving is best effort, the interview goes on in memory
+            pass
+
+
+class InterviewSessions:
+    """The interview of every chat session, saved under one directory"""
+
+    def __init__(self, root=INTERVIEW_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()
+
+    def get(self, session_id):
+        if not session_id.isalnum():
+            raise ValueError(f"Invalid session id: {session_id!r}")
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+                return session
+            path = os.path.join(self.root, session_id + ".json")
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                state = None
+            session = self._sessions[session_id] = InterviewSession(
+                path, state)
+            while len(self._sessions) > INTERVIEW_CACHE_SIZE:
+                self._sessions.popitem(last=False)
+        return session
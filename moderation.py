@@ -0,0 +1,171 @@
+"""Tiered moderation of mock interview answers
+
+A local stage of compiled patterns settles the clear cases: answers with
+explicit profanity or open hostility are blocked, and answers with nothing
+suspicious are allowed. Only answers with ambiguous words ("drugs", "kill",
+"hate", ...) go to the LLM. Verdicts are cached by normalized text.
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import llm_metrics
+
+# Moderated answers whose verdicts are kept
+MODERATION_CACHE_SIZE = int(os.getenv("MODERATION_CACHE_SIZE", "4096"))
+
+ALLOW, BLOCK, ESCALATE = "allow", "block", "escalate"
+
+# Flagged outright, whatever the context: clear profanity and insults
+# aimed at the interviewer. Crimes and other topics an answer may only
+# mention, like "uncovered embezzlement", are left to ESCALATE_PATTERNS.
+BLOCK_PATTERNS = {
+    "profanity": [
+        r"f+u+c+k+\w*", r"motherf+u+c+k+\w*",
+        r"s+h+i+t+(?:s|ty|tier|tiest|head|heads|hole|holes|show)?",
+        r"bullshit\w*", r"bitch(?:es|y)?", r"cunts?", r"assholes?",
+        r"bastards?", r"dickheads?", r"wtf", r"stfu"
+    ],
+    "disrespect": [
+        r"screw you", r"piss off", r"go to hell", r"kill yourself", r"kys",
+        r"you(?: are|'re| r)? (?:an? )?(?:idiot|moron)s?",
+        r"you(?: are|'re| r) (?:so |really )?(?:stupid|dumb)"
+    ],
+}
+
+# Words that may or may not be a problem, depending on context
+ESCALATE_PATTERNS = [
+    r"damn\w*", r"hell", r"crap\w*", r"suck\w*", r"hate\w*", r"stupid\w*",
+    r"idiot\w*", r"moron\w*", r"dumb\w*", r"shut up", r"pissed",
+    r"kill\w*", r"drugs?", r"weed", r"coke", r"cannabis", r"marijuana",
+    r"cocaine", r"heroin", r"meth", r"steal\w*", r"stole\w*", r"theft",
+    r"shoplift\w*", r"embezzl\w*", r"fraud\w*", r"illegal\w*",
+    r"arrest\w*", r"prison", r"jail\w*", r"fight\w*", r"punch\w*",
+    r"sex\w*", r"racis\w*", r"weapons?", r"guns?", r"cheat\w*", r"lied?",
+    r"lying", r"drunk", r"revenge", r"threat\w*"
+]
+
+# Curse words as they are censored, e.g. "f***", "f*cking" or "s**t"
+CENSORED_WORDS = [
+    "fuck", "fucks", "fucked", "fucker", "fucking", "motherfucker", "shit",
+    "shitty", "bullshit", "bitch", "cunt", "asshole", "bastard", "dickhead"
+]
+
+# Words with letters masked by asterisks, matched before normalizing
+_MASKED = re.compile(r"(?<![\w*])[a-z][a-z*]*\*[a-z*]*(?![\w*])")
+
+_LEET = str.maketrans("0134578@$!", "oieastbasi")
+
+_BLOCK = re.compile(
+    "|".join(f"(?P<{category}>\\b(?:{'|'.join(patterns)})\\b)"
+             for category, patterns in BLOCK_PATTERNS.items()))
+_ESCALATE = re.compile(r"\b(?:" + "|".join(ESCALATE_PATTERNS) + r")\b")
+
+_verdicts = OrderedDict()
+_lock = threading.Lock()
+_counts = {"local_allow": 0, "local_block": 0, "cache_hit": 0, "llm": 0}
+
+
+def normalize(text):
+    """Casefold and collapse whitespace, the key verdicts are cached by"""
+    return " ".join(text.casefold().split())
+
+
+def _deobfuscate(text):
+    # Undo digit and symbol substitutions ("sh1t", "$tupid") in words that
+    # contain letters, leaving plain numbers and closing punctuation alone
+    def word(match):
+        return match.group(1).translate(_LEET) + match.group(2)
+
+    return re.sub(r"(\S*[a-z]\S*?)([!?.,;:]*)(?=\s|$)", word, text)
+
+
+def _censored(word):
+    """Whether a masked word is one of CENSORED_WORDS with letters hidden"""
+    return any(
+        len(word) == len(curse) and all(
+            c == "*" or c == letter for c, letter in zip(word, curse))
+        for curse in CENSORED_WORDS)
+
+
+def local_verdict(text):
+    """(ALLOW, BLOCK or ESCALATE, reason) from the local patterns alone"""
+    normalized = normalize(text)
+    masked = _MASKED.findall(normalized)
+    if any(_censored(word) for word in masked):
+        return BLOCK, "profanity"
+    words = _deobfuscate(normalized.replace("’", "'"))
+    match = _BLOCK.search(words)
+    if match:
+        return BLOCK, match.lastgroup
+    if masked or _ESCALATE.search(words):
+        return ESCALATE, "ambiguous"
+    letters = [c for c in normalized if c.isalpha()]
+    if letters and sum(c.isascii() for c in letters) < len(letters) / 2:
+        # Mostly non-English text, which the patterns cannot judge
+        return ESCALATE, "language"
+    return ALLOW, None
+
+
+def parse_verdict(reply):
+    """True or False from the moderation prompt's reply
+
+    Only 'True' or 'False' (ignoring case, quotes and a trailing full
+    stop) are accepted; anything else raises ValueError.
+    """
+    word = reply.strip().strip("'\"`.").strip().casefold()
+    if word == "true":
+        return True
+    if word == "false":
+        return False
+    raise ValueError(f"Unexpected moderation reply: {reply!r}")
+
+
+def is_appropriate(text, ask_llm):
+    """Whether an answer is acceptable in an interview
+
+    `ask_llm(text)` is only called for answers the local stage cannot
+    settle, and returns the reply of the moderation prompt. A reply that
+    cannot be parsed counts as inappropriate but is not cached.
+    """
+    key = normalize(text)
+    with _lock:
+        verdict = _verdicts.get(key)
+        if verdict is not None:
+            _verdicts.move_to_end(key)
+            _counts["cache_hit"] += 1
+    if verdict is not None:
+        llm_metrics.record_cache_hit()
+        return verdict
+
+    decision, _ = local_verdict(text)
+    if decision == ESCALATE:
+        try:
+            verdict = parse_verdict(ask_llm(text))
+        except ValueError:
+            return False
+        count = "llm"
+    else:
+        verdict = decision == ALLOW
+        count = "local_allow" if verdict else "local_block"
+        llm_metrics.record(None, cache="local")
+
+    with _lock:
+        _counts[count] += 1
+        _verdicts[key] = verdict
+        while len(_verdicts) > MODERATION_CACHE_SIZE:
+            _verdicts.popitem(last=False)
+    return verdict
+
+
+def clear():
+    """Forget the cached verdicts"""
+    with _lock:
+        _verdicts.clear()
+
+
+def stats():
+    """How many answers each stage settled"""
+    with _lock:
+        return dict(_counts, cached=len(_verdicts))
@@ -0,0 +1,140 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from PyPDF2 import PdfReader
+
+# Extracted text is kept on disk, named by the SHA-256 of the PDF bytes
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", "pdf_text_cache")
+PDF_CACHE_MAX_BYTES = int(
+    os.getenv("PDF_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# ...and the most recently used texts in memory as well
+PDF_CACHE_MEMORY_BYTES = int(
+    os.getenv("PDF_CACHE_MEMORY_BYTES", str(16 * 1024 * 1024)))
+
+# PDFs with at least this many pages are extracted across processes
+PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "16"))
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(os.cpu_count() or 1)))
+
+_memory = OrderedDict()
+_memory_size = 0
+_lock = threading.Lock()
+_pool = None
+
+
+def pdf_bytes(pdf_file):
+    """Raw bytes of an uploaded file, open file, path or bytes"""
+    if isinstance(pdf_file, bytes):
+        return pdf_file
+    if isinstance(pdf_file, (str, os.PathLike)):
+        with open(pdf_file, "rb") as f:
+            return f.read()
+    if hasattr(pdf_file, "getvalue"):
+        return pdf_file.getvalue()
+    return pdf_file.read()
+
+
+def extract_pages(data, start, stop):
+    """Text of pages [start, stop) of a PDF, one string per page"""
+    reader = PdfReader(io.BytesIO(data))
+    return [str(reader.pages[i].extract_text()) for i in range(start, stop)]
+
+
+def get_process_pool():
+    """Process pool shared by CPU-bound PDF work"""
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS)
+    return _pool
+
+
+def extract_text(data, parallel=True):
+    """Extract the text of every page, in parallel for large PDFs"""
+    page_count = len(PdfReader(io.BytesIO(data)).pages)
+    if not parallel or page_count < PARALLEL_MIN_PAGES or PDF_WORKERS < 2:
+        return "".join(extract_pages(data, 0, page_count))
+    step = -(-page_count // PDF_WORKERS)
+    chunks = [
+        get_process_pool().submit(extract_pages, data, start,
+                                  min(start + step, page_count))
+        for start in range(0, page_count, step)
+    ]
+    return "".join(page for chunk in chunks for page in chunk.result())
+
+
+def _remember(key, text):
+    global _memory_size
+    size = len(text)
+    if size > PDF_CACHE_MEMORY_BYTES:
+        return
+    with _lock:
+        if key not in _memory:
+            _memory[key] = text
+            _memory_size += size
+        while _memory_size > PDF_CACHE_MEMORY_BYTES:
+            _memory_size -= len(_memory.popitem(last=False)[1])
+
+
+def _read_disk(key):
+    path = os.path.join(PDF_CACHE_DIR, key + ".txt")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+    except FileNotFoundError:
+        return None
+    # Touch the file so disk eviction sees it as recently used
+    os.utime(path)
+    return text
+
+
+def _write_disk(key, text):
+    os.makedirs(PDF_CACHE_DIR, exist_ok=True)
+    path = os.path.join(PDF_CACHE_DIR, key + ".txt")
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+    # Evict least recently used texts beyond the size cap
+    entries = []
+    for entry in os.scandir(PDF_CACHE_DIR):
+        if entry.name.endswith(".txt"):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, old_path in sorted(entries):
+        if total <= PDF_CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(old_path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def cached_pdf_text(data, parallel=True):
+    """Text of a PDF, cached by the SHA-256 of its bytes
+
+    Pass parallel=False when already running inside a pool worker.
+    """
+    key = hashlib.sha256(data).hexdigest()
+    with _lock:
+        text = _memory.get(key)
+        if text is not None:
+            _memory.move_to_end(key)
+            return text
+    text = _read_disk(key)
+    if text is None:
+        text = extract_text(data, parallel)
+        try:
+            _write_disk(key, text)
+        except OSError:
+            # The disk tier is best effort
+            pass
+    _remember(key, text)
+    return text
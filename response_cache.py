@@ -0,0 +1,165 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Cached answers kept, and how long each stays valid, in seconds
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", str(24 * 3600)))
+
+# Cosine similarity above which a differently worded question counts as the
+# same one; 0 turns the embedding tier off
+RESPONSE_CACHE_SIMILARITY = float(
+    os.getenv("RESPONSE_CACHE_SIMILARITY", "0.92"))
+
+# Embeddings computed on a miss, kept until the answer is stored
+PENDING_EMBEDDINGS = 64
+
+
+def normalize(text):
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    text = " ".join(text.lower().split())
+    return re.sub(r"[\s?!.,;:]+$", "", text)
+
+
+class _Index:
+    """Normalized embeddings of the cached questions of one room"""
+
+    def __init__(self):
+        self.keys = []
+        self.vectors = None
+
+    def add(self, key, vector):
+        self.keys.append(key)
+        row = vector[np.newaxis, :]
+        self.vectors = row if self.vectors is None else np.vstack(
+            [self.vectors, row])
+
+    def remove(self, key):
+        i = self.keys.index(key)
+        del self.keys[i]
+        self.vectors = np.delete(self.vectors, i, axis=0)
+
+    def nearest(self, vector):
+        if not self.keys:
+            return None, 0.0
+        scores = self.vectors @ vector
+        i = int(np.argmax(scores))
+        return self.keys[i], float(scores[i])
+
+
+class ResponseCache:
+    """Answers to repeated questions, keyed by room and prompt version
+
+    Exact matches on the normalized question are tried first. When an
+    `embed` function is given (and NumPy is available), a question close
+    enough to a cached one reuses its answer too.
+    """
+
+    def __init__(self,
+                 max_entries=RESPONSE_CACHE_SIZE,
+                 ttl=RESPONSE_CACHE_TTL,
+                 similarity=RESPONSE_CACHE_SIMILARITY,
+                 embed=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity = similarity
+        self.embed = embed if np is not None and similarity > 0 else None
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._indexes = {}
+        self._pending = OrderedDict()
+
+    def get(self, room, version, question):
+        key = (room, version, normalize(question))
+        with self._lock:
+            response = self._lookup(key)
+            if response is not None:
+                self.hits += 1
+                return response
+        vector = self._embedding(key) if self.embed is not None else None
+        if vector is not None:
+            with self._lock:
+                index = self._indexes.get(key[:2])
+                nearest, score = (index.nearest(vector)
+                                  if index is not None else (None, 0.0))
+                if nearest is not None and score >= self.similarity:
+                    response = self._lookup(nearest)
+                    if response is not None:
+                        self.semantic_hits += 1
+                        return response
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, room, version, question, response):
+        key = (room, version, normalize(question))
+        vector = self._embedding(key) if self.embed is not None else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (response, time.monotonic() + self.ttl)
+            if vector is not None:
+                self._indexes.setdefault(key[:2], _Index()).add(key, vector)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def caching_stream(self, room, version, question, chunks):
+        """Pass a response stream through, caching the text once it ends"""
+        parts = []
+        for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
+        self.put(room, version, question, "".join(parts))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses
+            }
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        response, expires = entry
+        if time.monotonic() > expires:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return response
+
+    def _remove(self, key):
+        del self._entries[key]
+        index = self._indexes.get(key[:2])
+        if index is not None and key in index.keys:
+            index.remove(key)
+
+    def _embedding(self, key):
+        """Embedding of a question, or None if it could not be computed"""
+        with self._lock:
+            vector = self._pending.get(key)
+        if vector is None:
+            try:
+                vector = np.asarray(self.embed(key[2]), dtype=np.float32)
+            except Exception:
+                # Fall back to exact matches only
+                return None
+            vector /= np.linalg.norm(vector) or 1.0
+            with self._lock:
+                self._pending[key] = vector
+                while len(self._pending) > PENDING_EMBEDDINGS:
+                    self._pending.popitem(last=False)
+        return vector
@@ -0,0 +1,100 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from background import submit
+from job_store import description_key, get_store
+from llm_client import chat_completion, chat_completion_stream
+from llm_metrics import instrumented, labels, record_cache_hit
+from pdf_cache import cached_pdf_text, pdf_bytes
+
+# Number of job descriptions whose extracted requirements are kept
+JOB_REQUIREMENTS_CACHE_SIZE = int(
+    os.getenv("JOB_REQUIREMENTS_CACHE_SIZE", "256"))
+
+_job_requirements = OrderedDict()
+_job_requirements_lock = threading.Lock()
+
+
+# Functions from resumeconst.py
+def readpdf(pdf_file):
+    """Read PDF file and extract text, reusing the text of a seen file"""
+    return cached_pdf_text(pdf_bytes(pdf_file))
+
+
+def analyze_with_openai(messages, stream=False):
+    """Generic function to interact with OpenAI API; errors are raised"""
+    if stream:
+        return chat_completion_stream(model="gpt-4o-mini",
+                                      messages=messages,
+                                      max_tokens=1000)
+    response = chat_completion(model="gpt-4o-mini",
+                               messages=messages,
+                               max_tokens=1000)
+    return response.choices[0].message.content.strip()
+
+
+@instrumented(room="Resume Analysis")
+def analyze_job_requirements(job_description):
+    """Analyze job description and extract requirements
+
+    Requirements are kept in the job store, so a repeated or near-identical
+    description skips the LLM and an edited one only sends what changed.
+    """
+    return get_store().requirements(job_description, analyze_with_openai)
+
+
+def cached_job_requirements(job_description):
+    """analyze_job_requirements, cached by a hash of the job description
+
+    Concurrent requests for the same description share a single LLM call.
+    Failed analyses are not cached.
+    """
+    key = description_key(job_description)
+    with _job_requirements_lock:
+        future = _job_requirements.get(key)
+        owner = future is None
+        if owner:
+            future = _job_requirements[key] = Future()
+            while len(_job_requirements) > JOB_REQUIREMENTS_CACHE_SIZE:
+                _job_requirements.popitem(last=False)
+        else:
+            _job_requirements.move_to_end(key)
+    if not owner:
+        record_cache_hit(room="Resume Analysis",
+                         function="analyze_job_requirements")
+    else:
+        try:
+            with labels(cache="miss"):
+                requirements = analyze_job_requirements(job_description)
+        except Exception as e:
+            _forget_job_requirements(key, future)
+            future.set_exception(e)
+            raise
+        if requirements is None:
+            _forget_job_requirements(key, future)
+        future.set_result(requirements)
+    return future.result()
+
+
+def clear():
+    """Forget the cached job requirements"""
+    with _job_requirements_lock:
+        _job_requirements.clear()
+
+
+def _forget_job_requirements(key, future):
+    with _job_requirements_lock:
+        if _job_requirements.get(key) is future:
+            del _job_requirements[key]
+
+
+def prepare_analysis(pdf_file, job_description):
+    """Extract the resume text while the job requirements are analyzed
+
+    Returns (resume_text, job_requirements).
+    """
+    requirements = submit(cached_job_requirements, job_description)
+    resume_text = readpdf(pdf_file)
+    return resume_text, requirements.result()
@@ -0,0 +1,131 @@
+"""Fast first pass of resume screening, without the LLM
+
+Each extracted job requirement is matched against overlapping chunks of
+every resume by TF-IDF cosine similarity. A resume's coverage of a
+requirement is its best matching chunk, and its pre-rank score is the mean
+coverage over all requirements. All resumes of a batch are scored with one
+matrix product, so only the best candidates need a full LLM review.
+"""
+import re
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Words per resume chunk, and words shared by neighbouring chunks
+CHUNK_WORDS = 60
+CHUNK_OVERLAP = 20
+
+# Keeps "c++", "c#", "node.js" and "ci/cd" whole
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#]*(?:[./][a-z0-9+#]+)*")
+
+_BULLET = re.compile(r"^\s*(?:[-*•]+|\d+[.)])\s*")
+
+STOPWORDS = frozenset("""
+    a about above after all also an and any are as at be been being both but
+    by can could do does for from has have having in into is it its may more
+    must of on or other our over per should such than that the their them
+    these this those through to under using via was we well were what when
+    where which while who will with within would you your
+    ability able experience experienced knowledge good strong skills skill
+    plus preferred required requirement requirements years year working work
+    job position role candidate including include etc
+""".split())
+
+
+def tokenize(text):
+    """Lowercased words of a text, without stopwords"""
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def requirement_lines(job_requirements):
+    """The individual requirements in analyze_job_requirements' output
+
+    One per non-empty line, without list markers. Lines with no words
+    left after dropping stopwords (headings such as "Requirements:") are
+    skipped.
+    """
+    lines = []
+    for line in job_requirements.splitlines():
+        line = _BULLET.sub("", line).strip(" *:")
+        if tokenize(line):
+            lines.append(line)
+    return lines
+
+
+def chunk_tokens(tokens, size=CHUNK_WORDS, overlap=CHUNK_OVERLAP):
+    """Overlapping windows of a resume's tokens; at least one, maybe empty"""
+    step = max(1, size - overlap)
+    starts = range(0, max(1, len(tokens) - overlap), step)
+    return [tokens[start:start + size] for start in starts]
+
+
+def coverage(resume_texts, job_requirements):
+    """How well each resume covers each requirement, from 0 to 1
+
+    Returns an array of shape (resumes, requirements), or None if NumPy
+    is not installed or no requirements could be found.
+    """
+    requirements = [
+        tokenize(line) for line in requirement_lines(job_requirements or "")
+    ]
+    if np is None or not requirements:
+        return None
+
+    # Only words that occur in the requirements can add to a similarity
+    vocabulary = {}
+    for tokens in requirements:
+        for token in tokens:
+            vocabulary.setdefault(token, len(vocabulary))
+    if not resume_texts:
+        return np.zeros((0, len(requirements)), dtype=np.float32)
+
+    def term_counts(rows):
+        counts = np.zeros((len(rows), len(vocabulary)), dtype=np.float32)
+        for i, tokens in enumerate(rows):
+            for token, n in Counter(tokens).items():
+                j = vocabulary.get(token)
+                if j is not None:
+                    counts[i, j] = n
+        return counts
+
+    chunks = []
+    bounds = [0]
+    for text in resume_texts:
+        chunks.extend(chunk_tokens(tokenize(text)))
+        bounds.append(len(chunks))
+    chunk_counts = term_counts(chunks)
+
+    # Words found in fewer resumes weigh more
+    resume_frequency = (np.maximum.reduceat(chunk_counts, bounds[:-1], axis=0)
+                        > 0).sum(axis=0)
+    idf = np.log((1 + len(resume_texts)) / (1 + resume_frequency)) + 1
+
+    def normalized(counts):
+        weights = np.log1p(counts) * idf
+        norms = np.linalg.norm(weights, axis=1, keepdims=True)
+        return weights / np.where(norms == 0, 1, norms)
+
+    similarity = normalized(term_counts(requirements)) @ normalized(
+        chunk_counts).T
+    # Best chunk of each resume, per requirement
+    return np.maximum.reduceat(similarity, bounds[:-1], axis=1).T
+
+
+def prerank_scores(resume_texts, job_requirements):
+    """Mean requirement coverage of each resume, from 0 to 100, or None"""
+    matrix = coverage(resume_texts, job_requirements)
+    if matrix is None:
+        return None
+    return [float(score) for score in matrix.mean(axis=1) * 100]
+
+
+def shortlist(scores, top_k):
+    """Indexes of the `top_k` best scores, best first"""
+    if top_k <= 0 or top_k >= len(scores):
+        return sorted(range(len(scores)), key=lambda i: -scores[i])
+    best = np.argpartition(-np.asarray(scores), top_k - 1)[:top_k]
+    return sorted(best.tolist(), key=lambda i: -scores[i])
+
@@ -0,0 +1,255 @@
+"""Structured resume scoring against job requirements
+
+The LLM returns its analysis as JSON with a match for every requirement.
+The score is computed here from those matches, so changing how much each
+requirement counts rescores a cached review without another LLM call.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from llm_client import chat_completion
+from llm_metrics import instrumented, labels, record_cache_hit
+from prompts import RESUME_REPAIR, RESUME_SCORING
+
+SCORING_MODEL = "gpt-4o-mini"
+
+# Reviews kept, by resume and job requirements
+RESUME_REVIEW_CACHE_SIZE = int(os.getenv("RESUME_REVIEW_CACHE_SIZE", "256"))
+
+# Resumes shorter than this are taken to be scanned or image-only PDFs
+MIN_RESUME_LENGTH = 100
+
+IMPORTANCE = ("must", "nice")
+DEFAULT_WEIGHTS = {"must": 2.0, "nice": 1.0}
+
+NOT_ATS_MESSAGE = "The File is not in ATS format, Please provide an ATS format resume"
+NOT_RESUME_MESSAGE = "The uploaded file is not a resume."
+NO_REQUIREMENTS_MESSAGE = "The job requirements could not be extracted, so the resume was not scored."
+
+_STRING_LIST = {"type": "array", "items": {"type": "string"}}
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "is_resume": {"type": "boolean"},
+        "position": {"type": "string"},
+        "requirements": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "requirement": {"type": "string"},
+                    "importance": {"type": "string", "enum": list(IMPORTANCE)},
+                    "match": {"type": "integer"},
+                    "evidence": {"type": "string"},
+                },
+                "required": ["requirement", "importance", "match", "evidence"],
+                "additionalProperties": False,
+            },
+        },
+        "analysis": {"type": "string"},
+        "suggestions": _STRING_LIST,
+        "ats_reformatting": _STRING_LIST,
+        "updated_resume": {"type": "string"},
+    },
+    "required": [
+        "is_resume", "position", "requirements", "analysis", "suggestions",
+        "ats_reformatting", "updated_resume"
+    ],
+    "additionalProperties": False,
+}
+
+RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "resume_review",
+        "strict": True,
+        "schema": SCHEMA
+    },
+}
+
+_reviews = OrderedDict()
+_reviews_lock = threading.Lock()
+
+
+class ReviewFormatError(ValueError):
+    """The LLM's review does not follow the schema"""
+
+
+@dataclass(frozen=True)
+class RequirementMatch:
+    requirement: str
+    importance: str
+    match: int
+    evidence: str
+
+
+@dataclass(frozen=True)
+class ResumeReview:
+    """A resume's analysis and per-requirement matches for one job"""
+    is_resume: bool
+    position: str
+    requirements: tuple
+    analysis: str
+    suggestions: tuple
+    ats_reformatting: tuple
+    updated_resume: str
+
+    def score(self, weights=None):
+        """Weighted average match, from 0 to 100
+
+        `weights` maps an importance ("must", "nice") or a requirement's own
+        text to how much it counts, over DEFAULT_WEIGHTS.
+        """
+        if not self.is_resume or not self.requirements:
+            return 0.0
+        weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        total = matched = 0.0
+        for r in self.requirements:
+            weight = weights.get(r.requirement, weights[r.importance])
+            total += weight
+            matched += weight * r.match
+        return matched / total if total else 0.0
+
+    def as_markdown(self):
+        if not self.is_resume:
+            return self.analysis or NOT_RESUME_MESSAGE
+
+        def bullets(items):
+            return "".join(f"\n- {item}" for item in items)
+
+        return (f"1. *Resume Analysis*: {self.analysis}\n"
+                f"2. *Suggestions to Improve*:{bullets(self.suggestions)}\n"
+                f"3. *ATS Reformatting*:{bullets(self.ats_reformatting)}\n"
+                f"4. *Updated Resume*:\n{self.updated_resume}")
+
+
+def not_a_resume(message):
+    return ResumeReview(False, "", (), message, (), (), "")
+
+
+def _field(data, name, kind, path=""):
+    try:
+        value = data[name]
+    except (KeyError, TypeError) as e:
+        raise ReviewFormatError(f"missing {path}{name}") from e
+    # bool is an int, but never a valid match
+    if not isinstance(value, kind) or (kind is int
+                                       and isinstance(value, bool)):
+        raise ReviewFormatError(f"{path}{name} must be of type {kind.__name__}")
+    return value
+
+
+def _strings(data, name):
+    values = _field(data, name, list)
+    if not all(isinstance(v, str) for v in values):
+        raise ReviewFormatError(f"{name} must be a list of strings")
+    return tuple(values)
+
+
+def parse_review(text):
+    """Validate the LLM's JSON and build a ResumeReview, in one pass
+
+    Raises ReviewFormatError naming the first problem found.
+    """
+    try:
+        data = json.loads(text)
+    except (TypeError, ValueError) as e:
+        raise ReviewFormatError(f"not JSON: {e}") from e
+    if not isinstance(data, dict):
+        raise ReviewFormatError("not a JSON object")
+
+    requirements = []
+    for i, item in enumerate(_field(data, "requirements", list)):
+        path = f"requirements[{i}]."
+        importance = _field(item, "importance", str, path)
+        if importance not in IMPORTANCE:
+            raise ReviewFormatError(f"{path}importance must be one of "
+                                    f"{', '.join(IMPORTANCE)}")
+        match = _field(item, "match", int, path)
+        if not 0 <= match <= 100:
+            raise ReviewFormatError(f"{path}match must be from 0 to 100")
+        requirements.append(
+            RequirementMatch(_field(item, "requirement", str, path),
+                             importance, match,
+                             _field(item, "evidence", str, path)))
+
+    return ResumeReview(is_resume=_field(data, "is_resume", bool),
+                        position=_field(data, "position", str),
+                        requirements=tuple(requirements),
+                        analysis=_field(data, "analysis", str),
+                        suggestions=_strings(data, "suggestions"),
+                        ats_reformatting=_strings(data, "ats_reformatting"),
+                        updated_resume=_field(data, "updated_resume", str))
+
+
+def _request(messages):
+    response = chat_completion(model=SCORING_MODEL,
+                               messages=messages,
+                               response_format=RESPONSE_FORMAT,
+                               max_tokens=3000)
+    return response.choices[0].message.content
+
+
+def _repair(text, error):
+    """One more try at a malformed review, without resending the resume"""
+    return _request(
+        RESUME_REPAIR.messages(f"Error: {error}\n\nAnalysis:\n{text}"))
+
+
+def clear():
+    """Forget the cached reviews"""
+    with _reviews_lock:
+        _reviews.clear()
+
+
+def review_key(resume_text, job_requirements):
+    """Cache key of a review, or None without job requirements"""
+    if job_requirements is None:
+        return None
+    payload = "\0".join([RESUME_SCORING.version, resume_text, job_requirements])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@instrumented(room="Resume Analysis")
+def review_resume(resume_text, job_requirements):
+    """Structured review of a resume, cached by resume and requirements
+
+    A malformed reply is repaired once; if that fails too,
+    ReviewFormatError is raised. Without job requirements (None, as when
+    extracting them failed) nothing is sent and the review scores 0.
+    """
+    if len(resume_text) < MIN_RESUME_LENGTH:
+        return not_a_resume(NOT_ATS_MESSAGE)
+    if job_requirements is None:
+        return ResumeReview(True, "", (), NO_REQUIREMENTS_MESSAGE, (), (), "")
+
+    key = review_key(resume_text, job_requirements)
+    with _reviews_lock:
+        review = _reviews.get(key)
+        if review is not None:
+            _reviews.move_to_end(key)
+    if review is not None:
+        record_cache_hit()
+        return review
+
+    with labels(cache="miss"):
+        text = _request(
+            RESUME_SCORING.messages(f"Resume:\n{resume_text}\n\n"
+                                    f"Job Requirements:\n{job_requirements}"))
+        try:
+            review = parse_review(text)
+        except ReviewFormatError as e:
+            review = parse_review(_repair(text, e))
+    if not review.is_resume:
+        review = not_a_resume(NOT_RESUME_MESSAGE)
+
+    with _reviews_lock:
+        _reviews[key] = review
+        while len(_reviews) > RESUME_REVIEW_CACHE_SIZE:
+            _reviews.popitem(last=False)
+    return review
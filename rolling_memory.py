@@ -0,0 +1,120 @@
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+from langchain.base_language import BaseLanguageModel
+from langchain.callbacks import get_openai_callback
+from langchain.memory.prompt import SUMMARY_PROMPT
+# BaseMemory is a pydantic v1 model, whichever pydantic is installed
+from langchain.pydantic_v1 import PrivateAttr
+from langchain.schema import BaseMemory
+
+import llm_metrics
+from background import submit
+
+
+class RollingSummaryMemory(BaseMemory):
+    """Recent turns kept verbatim, older ones folded into a summary
+
+    Unlike ConversationSummaryMemory, saving a turn never calls the LLM.
+    Once `summarize_every` turns have piled up beyond the verbatim `window`,
+    or the kept turns exceed `max_window_tokens`, the overflow is summarized
+    on a background thread. Until that finishes the overflow stays verbatim,
+    so nothing is lost in the meantime.
+    """
+
+    llm: BaseLanguageModel
+    memory_key: str = "history"
+    human_prefix: str = "Human"
+    ai_prefix: str = "AI"
+    window: int = 3
+    summarize_every: int = 3
+    max_window_tokens: int = 1500
+
+    _summary: str = PrivateAttr(default="")
+    _turns: list = PrivateAttr(default_factory=list)
+    _pending: Any = PrivateAttr(default=None)
+    _generation: int = PrivateAttr(default=0)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def memory_variables(self) -> List[str]:
+        return [self.memory_key]
+
+    @property
+    def buffer(self) -> str:
+        with self._lock:
+            summary, turns = self._summary, list(self._turns)
+        lines = [f"Summary: {summary}"] if summary else []
+        lines.extend(self._format(turns))
+        return "\n".join(lines)
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, str]:
+        return {self.memory_key: self.buffer}
+
+    def save_context(self, inputs: Dict[str, Any],
+                     outputs: Dict[str, str]) -> None:
+        human = inputs[self._input_key(inputs)]
+        ai = next(iter(outputs.values()))
+        with self._lock:
+            self._turns.append((human, ai))
+            if self._pending is not None:
+                return
+            overflow = self._turns[:-self.window]
+            if not overflow:
+                return
+            if (len(overflow) < self.summarize_every
+                    and self._window_tokens() <= self.max_window_tokens):
+                return
+            self._pending = submit(self._summarize, self._summary, overflow,
+                                   self._generation)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._summary = ""
+            self._turns = []
+            # A summary still in flight is dropped when it lands
+            self._pending = None
+            self._generation += 1
+
+    def _summarize(self, summary, turns, generation):
+        new_lines = "\n".join(self._format(turns))
+        started = time.perf_counter()
+        status = "ok"
+        with get_openai_callback() as cb:
+            try:
+                updated = self.llm(
+                    SUMMARY_PROMPT.format(summary=summary,
+                                          new_lines=new_lines)).strip()
+            except Exception:
+                updated = None
+                status = "error"
+        # LangChain calls OpenAI itself, so account for it from its totals
+        llm_metrics.record(getattr(self.llm, "model_name", None),
+                           SimpleNamespace(
+                               prompt_tokens=cb.prompt_tokens,
+                               completion_tokens=cb.completion_tokens),
+                           time.perf_counter() - started,
+                           status=status,
+                           cost_usd=cb.total_cost,
+                           function="rolling_summary")
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._pending = None
+            if updated is not None:
+                self._summary = updated
+                del self._turns[:len(turns)]
+
+    def _window_tokens(self):
+        return self.llm.get_num_tokens("\n".join(self._format(self._turns)))
+
+    def _format(self, turns):
+        for human, ai in turns:
+            yield f"{self.human_prefix}: {human}"
+            yield f"{self.ai_prefix}: {ai}"
+
+    def _input_key(self, inputs):
+        keys = [key for key in inputs if key not in self.memory_variables]
+        return keys[0]
@@ -0,0 +1,155 @@
+"""Replies of each chat room, independent of the Streamlit page
+
+The app renders these; benchmark.py drives them directly.
+"""
+import threading
+
+from context_builder import ConversationContext
+from llm_client import (chat_completion, chat_completion_stream,
+                        create_embedding)
+from llm_metrics import instrumented, labels, record_cache_hit
+from moderation import is_appropriate
+from prompts import EXTREME_WARNING, MODERATION, ROOM_PROMPTS
+from response_cache import ResponseCache
+
+# Set the model to use
+MODEL = "gpt-4o-mini"  # Change this to your desired model, e.g., "gpt-4-0125-preview" for GPT-4 Turbo
+
+# Embedding model used to match reworded questions in the answer cache
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Process-wide cache of answers to repeated questions"""
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+
+            @instrumented()
+            def embed(text):
+                response = create_embedding(model=EMBEDDING_MODEL, input=text)
+                return response.data[0].embedding
+
+            _response_cache = ResponseCache(embed=embed)
+    return _response_cache
+
+
+def clear():
+    """Forget the cached answers of every room"""
+    global _response_cache
+    with _response_cache_lock:
+        _response_cache = None
+
+
+def generate_response(prompt,
+                      room,
+                      stream=False,
+                      cached=False,
+                      history=None,
+                      context=None,
+                      offset=0):
+    """Get a room's reply; with `stream` set, yields the text as it arrives
+
+    With `cached` set, answers to questions asked before are reused, as
+    long as no earlier turns or summary are sent along with them. For
+    stateful rooms pass the earlier turns as `history` (starting at absolute
+    position `offset`) and the room's ConversationContext, which fits them
+    into the token budget. Errors from the LLM request are raised, for the
+    caller to show.
+    """
+    with labels(room=room, function="generate_response"):
+        conversation = ()
+        if history is not None:
+            context = context or ConversationContext()
+            conversation = context.build(history, offset)
+        if conversation:
+            # Replies depend on the conversation, so they are not reusable;
+            # a first question, with no turns or summary yet, still is
+            cached = False
+        # The static system prompt stays first, so its prefix can be cached
+        messages = ROOM_PROMPTS[room].messages(prompt, conversation)
+
+        if cached:
+            cache = get_response_cache()
+            version = ROOM_PROMPTS[room].version
+            response = cache.get(room, version, prompt)
+            if response is not None:
+                record_cache_hit()
+                return iter([response]) if stream else response
+
+        with labels(cache="miss" if cached else "none"):
+            if stream:
+                chunks = chat_completion_stream(model=MODEL,
+                                                messages=messages,
+                                                temperature=1.2)
+                if cached:
+                    return cache.caching_stream(room, version, prompt, chunks)
+                return chunks
+            response = chat_completion(model=MODEL,
+                                       messages=messages,
+                                       temperature=1.2)
+            content = response.choices[0].message.content
+            if cached:
+                cache.put(room, version, prompt, content)
+            return content
+
+
+@instrumented(room="Mock Interview")
+def check_appropriate(input):
+    """True if an interview answer is acceptable
+
+    Clear cases are settled locally; see moderation.py.
+    """
+    return is_appropriate(input, ask_moderation)
+
+
+def ask_moderation(input):
+    """The moderation prompt's 'True' or 'False' for an answer"""
+    response = chat_completion(model=MODEL,
+                               messages=MODERATION.messages(input),
+                               temperature=0,
+                               max_tokens=3)
+    return response.choices[0].message.content
+
+
+@instrumented(room="Mock Interview")
+def extreme_warning(input):
+    response = chat_completion(model=MODEL,
+                               messages=EXTREME_WARNING.messages(input))
+    return response.choices[0].message.content
+
+
+_BEHAVIOURAL = "Ask user some relevant behavioural questions to test user's problem solving skills in different scenarios"
+
+# What the interviewer asks for at each question; the last entry repeats
+INTERVIEW_PLAN = (
+    "Greet the user and Ask user about what profession/industry he is working towards and the position he wishes to apply for in the company",
+    "Ask user some relevant general questions to test user's observation, creativity and self-awareness.",
+    "ask user some relevant industry specific questions  to  test user knowledge and skills in that industry",
+    "Ask user a compeltely random question that tests user quick and critical thinking",
+    _BEHAVIOURAL,
+    _BEHAVIOURAL,
+    _BEHAVIOURAL,
+    "Ask user some cultural/motivation/Future goals questions",
+)
+
+
+def get_next_interview_question(num, history, stream=False, context=None):
+    prompt = INTERVIEW_PLAN[min(num, len(INTERVIEW_PLAN) - 1)]
+    return generate_response(prompt,
+                             "Mock Interview (Question)",
+                             stream,
+                             history=history,
+                             context=context)
+
+
+def get_interview_feedback(history, stream=False, context=None):
+    prompt = "Provide constructive feedback on the interviewee's performance."
+    return generate_response(prompt,
+                             "Mock Interview (Feedback)",
+                             stream,
+                             history=history,
+                             context=context)
@@ -1,19 +1,29 @@
-import os
+import base64
 import streamlit as st
-from openai import OpenAI
+from background import submit
+from image_cache import cached_image
+from llm_client import chat_completion, chat_completion_stream, generate_image
+from llm_metrics import instrumented
 #from google.colab import userdata
 #from IPython.display import Image
 
-#client = OpenAI(api_key = os.environ['OPENAI_API_KEY'])
-client = OpenAI(api_key = st.secrets['OPENAI_API_KEY']) #for streamlit deployment
+OPENAI_API_KEY = st.secrets['OPENAI_API_KEY'] #for streamlit deployment
+
+# The cover is designed from the story's opening once this many paragraphs
+# have been written, while the rest of the story is still generating
+COVER_PARAGRAPHS = 2
+
 #Story
-def story_gen(prompt):
+@instrumented(room='Storybook')
+def story_gen(prompt, stream=False):
   system_prompt = """
   You are a world-class romance book author. You are a hopeless romantic wife and mother with a loving husband and kids.
   You get inspiration from your life, and you are also emotional and dramatic.
   """
 
-  response = client.chat.completions.create(
+  request = chat_completion_stream if stream else chat_completion
+  response = request(
+    api_key=OPENAI_API_KEY,
     model="gpt-4o-mini",
     messages=[
       {'role': 'system', 'content': system_prompt},
@@ -22,25 +32,33 @@ def story_gen(prompt):
     temperature = 1.2,
     max_tokens = 1500
   )
-  return response.choices[0].message.content
+  return response if stream else response.choices[0].message.content
 
-#cover
-def art_gen(prompt):
-  response = client.images.generate(
+#cover, cached locally by prompt
+@instrumented(room='Storybook')
+def paint(prompt):
+  response = generate_image(
+      api_key = OPENAI_API_KEY,
       model = 'dall-e-2',
       prompt = prompt,
       size = '1024x1024',
-      n = 1
+      n = 1,
+      response_format = 'b64_json'
   )
-  return response.data[0].url
+  return base64.b64decode(response.data[0].b64_json)
+
+def art_gen(prompt):
+  return cached_image(prompt, paint)
 
 #cover prompt design
+@instrumented(room='Storybook')
 def design_gen(prompt):
   system_prompt = """
   You will be given a short story. Generate a prompt for a cover art that s suitable for the story.
   The prompt  is for dall-e-2.
   """
-  response = client.chat.completions.create(
+  response = chat_completion(
+      api_key = OPENAI_API_KEY,
       model = 'gpt-4o-mini',
       messages = [
           {'role':'system','content':system_prompt},
@@ -49,14 +67,33 @@ def design_gen(prompt):
   )
   return response.choices[0].message.content
 
-prompt = st.text_input("Enter a prompt")
-if st.button("Generate"):
-  story = story_gen(prompt)
+def cover_gen(story):
   design = design_gen(story)
-  art = art_gen(design)
+  return design, art_gen(design)
 
-  st.caption(design)
+prompt = st.text_input("Enter a prompt")
+if st.button("Generate"):
+  caption = st.empty()
   st.divider()
-  st.write(story)
+  story_box = st.empty()
   st.divider()
-  st.image(art)
\ No newline at end of file
+  cover_box = st.empty()
+  cover_box.info("Painting the cover...")
+
+  # Stream the story, starting on the cover as soon as its opening is written
+  cover = None
+  parts = []
+  for chunk in story_gen(prompt, stream=True):
+    parts.append(chunk)
+    story = "".join(parts)
+    if cover is None and story.count("\n\n") >= COVER_PARAGRAPHS:
+      cover = submit(cover_gen, story)
+    story_box.write(story)
+  story = "".join(parts)
+  story_box.write(story)
+  if cover is None:
+    cover = submit(cover_gen, story)
+
+  design, art = cover.result()
+  caption.caption(design)
+  cover_box.image(art)
\ No newline at end of file